@@ -0,0 +1,91 @@
+"""
+Startup benchmark for tts_tool.
+
+Measures, each in a fresh interpreter, how long `import tts_tool` takes and how long the GUI takes
+from launch until its window is shown. Exits with status 1 if the median of either exceeds its
+budget, or if importing the module pulls in openai, tkinter or pygame, which should only be loaded
+on first use.
+
+    python bench_startup.py
+    python bench_startup.py --runs 20 --import-budget-ms 80
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+IMPORT_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import tts_tool
+elapsed = time.perf_counter() - start
+heavy = [name for name in ("openai", "tkinter", "pygame") if name in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+WINDOW_SNIPPET = """
+import time
+start = time.perf_counter()
+import tts_tool
+tts_tool._load_gui_modules()
+root = tts_tool.tk.Tk()
+app = tts_tool.TTSApp(root)
+root.wait_visibility(root)
+print(time.perf_counter() - start)
+root.destroy()
+"""
+
+
+def _run(snippet: str):
+    """Runs snippet in a new interpreter next to tts_tool.py and returns its output, or None if it failed."""
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=Path(__file__).parent, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit status {result.returncode}")
+        return None
+    return result.stdout.split()
+
+
+def _report(name: str, samples: list, budget_ms: float) -> bool:
+    median_ms = statistics.median(samples) * 1000
+    print(f"{name}: median {median_ms:.1f} ms, min {min(samples) * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms "
+          f"over {len(samples)} runs (budget {budget_ms:.0f} ms)")
+    return median_ms <= budget_ms
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure tts_tool cold import and time-to-window.")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per measurement (default: %(default)s)")
+    parser.add_argument("--import-budget-ms", type=float, default=100, help="Budget for the median import time (default: %(default)s)")
+    parser.add_argument("--window-budget-ms", type=float, default=1500, help="Budget for the median time-to-window (default: %(default)s)")
+    parser.add_argument("--skip-window", action="store_true", help="Only measure the import, e.g. on machines without a display")
+    args = parser.parse_args()
+
+    ok = True
+    import_samples = []
+    for _ in range(args.runs):
+        output = _run(IMPORT_SNIPPET)
+        if output is None:
+            return 1
+        import_samples.append(float(output[0]))
+        if len(output) > 1:
+            print(f"Importing tts_tool loaded: {output[1]}")
+            ok = False
+    ok = _report("Cold import", import_samples, args.import_budget_ms) and ok
+
+    if not args.skip_window:
+        window_samples = []
+        for _ in range(args.runs):
+            output = _run(WINDOW_SNIPPET)
+            if output is None:
+                print("Time-to-window skipped: the GUI could not be started.")
+                break
+            window_samples.append(float(output[0]))
+        if window_samples:
+            ok = _report("Time-to-window", window_samples, args.window_budget_ms) and ok
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,1631 @@
-from openai import OpenAI
 from pathlib import Path
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from collections import deque
+from typing import Callable, Optional
+import argparse
 import threading
-import pygame
+import hashlib
+import json
+import shutil
+import unicodedata
+import io
+import re
+import sys
+import random
+import tempfile
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from email.utils import parsedate_to_datetime
 import platform
-import ctypes
 import time  # Added time
 from dotenv import load_dotenv
 import os
 
+# Heavy dependencies are loaded on first use: OpenAI clients on the first request (Endpoint.get_client),
+# tkinter when the GUI starts (_load_gui_modules) and pygame on the first playback (_init_mixer).
+# Importing this module, or using the command line, therefore needs no display or audio device.
+tk = ttk = filedialog = messagebox = pygame = None
+
 # Load environment variables from .env file
 load_dotenv()
 
-# --- DPI Awareness ---
-if platform.system() == "Windows":
+# --- Configuration ---
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# OpenAI's base URL
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+# Optional JSON list of endpoints to spread requests over, replacing OPENAI_API_KEY/OPENAI_BASE_URL (see _load_endpoints)
+ENDPOINTS_JSON = os.getenv("TTS_ENDPOINTS")
+API_CONFIGURED = bool(OPENAI_API_KEY or ENDPOINTS_JSON)
+CONFIGURATION_ERROR = None  # Why the endpoints could not be set up, if they could not; see _load_endpoints
+# Per-request input limit of the speech endpoint; longer text is split into chunks
+MAX_INPUT_CHARS = 4096
+# Concurrent speech requests: the adaptive limit starts at MAX_WORKERS and moves between 1 and MAX_CONCURRENCY
+# depending on rate limiting and latency (see AdaptiveConcurrencyLimiter)
+MAX_WORKERS = int(os.getenv("TTS_MAX_WORKERS", "4"))
+MAX_CONCURRENCY = max(MAX_WORKERS, int(os.getenv("TTS_MAX_CONCURRENCY", "16")))
+# Size of the first chunk when playing while converting; a short first request gets audio started sooner
+FIRST_CHUNK_CHARS = 300
+# Formats whose encoded streams can be joined back to back into one playable file
+CONCATENABLE_FORMATS = ("mp3", "aac", "opus", "pcm")
+# On-disk cache of synthesized audio, keyed on the request; a budget of 0 disables it
+CACHE_DIR = Path(os.getenv("TTS_CACHE_DIR", Path(__file__).parent / ".tts_cache"))
+CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+# HTTP transport of each endpoint. A pool size of 0 sizes it to the endpoint's maximum concurrency.
+HTTP_POOL_SIZE = int(os.getenv("TTS_HTTP_POOL_SIZE", "0"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("TTS_HTTP_KEEPALIVE_SECONDS", "120"))
+HTTP2 = os.getenv("TTS_HTTP2", "0").lower() in ("1", "true", "yes")  # Needs the optional h2 package
+HTTP_CONNECT_TIMEOUT = float(os.getenv("TTS_HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("TTS_HTTP_READ_TIMEOUT", "120"))
+# An endpoint that fails this many requests in a row is taken out of rotation for EJECT_SECONDS
+EJECT_AFTER_FAILURES = 3
+EJECT_SECONDS = 30.0
+# Retries of failed speech requests: attempts after the first, backoff bounds, and the total time allowed per chunk
+MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "5"))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+REQUEST_DEADLINE_SECONDS = float(os.getenv("TTS_REQUEST_DEADLINE_SECONDS", "300"))
+# Request and character budgets per minute, shared by all processes on this machine using the same key; 0 is unlimited
+REQUESTS_PER_MINUTE = float(os.getenv("TTS_REQUESTS_PER_MINUTE", "0"))
+CHARACTERS_PER_MINUTE = float(os.getenv("TTS_CHARACTERS_PER_MINUTE", "0"))
+RATE_LIMIT_DIR = Path(os.getenv("TTS_RATE_LIMIT_DIR", Path(tempfile.gettempdir()) / "tts_tool"))
+# Hedging: a request slower than HEDGE_PERCENTILE of recent ones gets a duplicate, within HEDGE_MAX_EXTRA extra load
+HEDGE_REQUESTS = os.getenv("TTS_HEDGE", "0").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("TTS_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MAX_EXTRA = float(os.getenv("TTS_HEDGE_MAX_EXTRA", "0.1"))
+# Low-latency playback of raw PCM (24 kHz, 16-bit, mono, as the API sends it): audio buffered before playback
+# starts or resumes after an underrun, and the most the buffer holds ahead of playback
+PCM_SAMPLE_RATE = 24000
+PCM_PREFILL_SECONDS = float(os.getenv("TTS_PCM_PREFILL_SECONDS", "0.25"))
+PCM_BUFFER_SECONDS = float(os.getenv("TTS_PCM_BUFFER_SECONDS", "30"))
+# Audio files at least this large are played by streaming them from disk (pygame.mixer.music) instead of
+# decoding them into memory first
+MUSIC_STREAM_MIN_BYTES = int(os.getenv("TTS_MUSIC_STREAM_MIN_BYTES", str(5 * 1024 * 1024)))
+# How often the GUI refreshes its idle connection to the API so the next conversion finds it open; 0 disables
+KEEP_WARM_SECONDS = float(os.getenv("TTS_KEEP_WARM_SECONDS", "45"))
+
+# --- Chunking ---
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"[.!?\u2026]+[\"'\u201d\u2019)\]]*\s+")
+CHUNK_BOUNDARY_ODDS = 4  # About one paragraph in this many may end a chunk early; see split_text
+
+
+def _split_sentences(paragraph: str, limit: int):
+    """Splits a paragraph into sentences, cutting any sentence longer than limit at whitespace."""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(paragraph):
+        sentences.append(paragraph[start:match.end()].strip())
+        start = match.end()
+    sentences.append(paragraph[start:].strip())
+
+    pieces = []
+    for sentence in filter(None, sentences):
+        while len(sentence) > limit:
+            cut = sentence.rfind(" ", 0, limit + 1)
+            if cut <= 0:
+                cut = limit  # No whitespace to break on, fall back to a hard cut
+            pieces.append(sentence[:cut].rstrip())
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            pieces.append(sentence)
+    return pieces
+
+
+def _is_chunk_boundary(paragraph: str) -> bool:
+    digest = hashlib.blake2b(paragraph.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % CHUNK_BOUNDARY_ODDS == 0
+
+
+def split_text(text: str, limit: int = MAX_INPUT_CHARS, first_limit: Optional[int] = None) -> list[str]:
+    """
+    Splits text into chunks no longer than limit, breaking at paragraph and sentence boundaries.
+
+    Whole paragraphs are packed together while they fit; a paragraph longer than the limit is
+    broken into sentences, and a sentence longer than the limit is broken at whitespace.
+
+    Besides that, a chunk that is at least a quarter full also ends after any paragraph whose hash is
+    divisible by CHUNK_BOUNDARY_ODDS. Those boundaries depend only on the paragraphs' content, so
+    after an edit the chunks line up with the old ones again within a few paragraphs, and the
+    unchanged chunks further on are reused instead of synthesized again.
+
+    Args:
+        text (str): The text to split.
+        limit (int): The maximum number of characters per chunk.
+        first_limit (int, optional): A smaller limit for the first chunk only, so that it synthesizes quickly.
+
+    Returns:
+        list[str]: The chunks in reading order. Empty if the text is blank.
+    """
+    chunks = []
+    current = ""
+    for paragraph in _PARAGRAPH_BREAK_RE.split(text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        cap = first_limit if first_limit and not chunks else limit
+        units = [paragraph] if len(paragraph) <= cap else _split_sentences(paragraph, cap)
+        for index, unit in enumerate(units):
+            cap = first_limit if first_limit and not chunks else limit
+            separator = "\n\n" if index == 0 else " "
+            if current and len(current) + len(separator) + len(unit) <= cap:
+                current += separator + unit
+            else:
+                if current:
+                    chunks.append(current)
+                current = unit
+        if len(current) >= cap // 4 and _is_chunk_boundary(paragraph):
+            chunks.append(current)
+            current = ""
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# --- File Locking ---
+@contextmanager
+def _locked_file(path: Path):
+    """Opens path for reading and writing under an exclusive lock that other processes respect."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as locked:
+        if platform.system() == "Windows":
+            import msvcrt
+            locked.seek(0)  # Append mode starts at the end of the file; every process must lock the same byte
+            while True:
+                try:
+                    msvcrt.locking(locked.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after about 10 seconds; keep waiting
+            try:
+                yield locked
+            finally:
+                locked.flush()  # Written state must reach the file before another process can lock it
+                locked.seek(0)
+                msvcrt.locking(locked.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(locked, fcntl.LOCK_EX)
+            try:
+                locked.seek(0)
+                yield locked
+            finally:
+                locked.flush()
+                fcntl.flock(locked, fcntl.LOCK_UN)
+
+
+# --- Cache ---
+def normalize_text(text: str) -> str:
+    """Normalizes text so that edits which cannot change the audio (line endings, runs of spaces) hash the same."""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = (re.sub(r"[ \t]+", " ", line).strip() for line in text.split("\n"))
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+class SynthesisCache:
+    """
+    Content-addressed store of synthesized audio files, bounded to max_bytes.
+
+    Entries are named after a hash of the request, so identical requests share one file. A file's
+    modification time doubles as its last-access time: hits touch it, and when the cache grows past
+    its budget the least recently used files are removed first.
+    """
+
+    def __init__(self, directory, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text_input: str, model: str, voice: str, speed: float, response_format: str) -> str:
+        request = "\0".join([normalize_text(text_input), model, voice, repr(float(speed)), response_format])
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, response_format: str) -> Path:
+        return self.directory / f"{key}.{response_format}"
+
+    def lock_path(self, key: str) -> Path:
+        """
+        Returns the lock file guarding the synthesis of key.
+
+        Each key has a file of its own: flock on separately opened files excludes threads of one process
+        from each other, so sharing a file between keys would serialize unrelated conversions.
+        """
+        return self.directory / "locks" / f"{key}.lock"
+
+    def _layout_path(self, key: str) -> Path:
+        return self.directory / "layouts" / f"{key}.json"
+
+    def layout(self, key: str) -> Optional[list]:
+        """Returns the chunk layout stored by put with key's audio, or None if there is none."""
+        try:
+            return json.loads(self._layout_path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key: str, response_format: str) -> Optional[Path]:
+        """Returns the cached file for key, marking it as recently used, or None on a miss."""
+        if self.max_bytes <= 0:
+            return None
+        path = self._path(key, response_format)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, response_format: str, source_path, layout: Optional[list] = None) -> None:
+        """
+        Copies source_path into the cache under key, then evicts old entries to stay within budget.
+
+        layout is the chunk manifest entries of source_path; it is kept with the audio, so that a file
+        later copied from the cache can still be converted again incrementally.
+        """
+        if self.max_bytes <= 0 or Path(source_path).stat().st_size > self.max_bytes:
+            return
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(key, response_format)
+            partial_path = path.with_name(path.name + ".part")
+            shutil.copyfile(source_path, partial_path)
+            os.replace(partial_path, path)
+            self._put_layout(key, layout)
+            self._evict()
+
+    def put_bytes(self, key: str, response_format: str, audio: bytes) -> None:
+        """Stores audio in the cache under key, then evicts old entries to stay within budget."""
+        if self.max_bytes <= 0 or len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(key, response_format)
+            partial_path = path.with_name(path.name + ".part")
+            partial_path.write_bytes(audio)
+            os.replace(partial_path, path)
+            self._put_layout(key, None)
+            self._evict()
+
+    def _put_layout(self, key: str, layout: Optional[list]):
+        path = self._layout_path(key)
+        if layout is None:
+            path.unlink(missing_ok=True)  # Would describe the audio this entry replaced
+            return
+        path.parent.mkdir(exist_ok=True)
+        partial_path = path.with_name(path.name + ".part")
+        partial_path.write_text(json.dumps(layout), encoding="utf-8")
+        os.replace(partial_path, path)
+
+    def _evict(self):
+        entries = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".part" or not path.is_file():
+                continue  # Skip files being written and the manifests, locks and layouts directories
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Removed by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self.lock_path(path.stem).unlink(missing_ok=True)  # At worst a waiting converter repeats the work
+            self._layout_path(path.stem).unlink(missing_ok=True)
+            total -= size
+
+
+synthesis_cache = SynthesisCache(CACHE_DIR, CACHE_MAX_BYTES)
+
+
+# --- Incremental re-synthesis ---
+# Each output file gets a manifest recording where every chunk's audio sits in it, so a later conversion
+# to the same file can copy the audio of unchanged chunks instead of synthesizing them again.
+MANIFEST_DIR = CACHE_DIR / "manifests"
+
+
+def _manifest_path(output_path: Path) -> Path:
+    return MANIFEST_DIR / (hashlib.sha256(str(output_path.resolve()).encode("utf-8")).hexdigest() + ".json")
+
+
+def _chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def _manifest_settings(model: str, voice: str, speed: float, response_format: str) -> dict:
+    return {"model": model, "voice": voice, "speed": repr(float(speed)), "response_format": response_format}
+
+
+def _load_manifest(output_path: Path, settings: dict) -> dict:
+    """
+    Returns {chunk_hash: (offset, length)} for the last conversion written to output_path.
+
+    The result is empty if there is no manifest, it was made with different settings, or the output
+    file has been changed since it was written.
+    """
     try:
-        # Try for Per-Monitor DPI Awareness V2
-        ctypes.windll.shcore.SetProcessDpiAwareness(2)
-    except (AttributeError, OSError):
+        manifest = json.loads(_manifest_path(output_path).read_text(encoding="utf-8"))
+        stat = output_path.stat()
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("settings") != settings or manifest.get("size") != stat.st_size or manifest.get("mtime_ns") != stat.st_mtime_ns:
+        return {}
+    return {entry["hash"]: (entry["offset"], entry["length"]) for entry in manifest["chunks"]}
+
+
+def _save_manifest(output_path: Path, settings: dict, entries: list) -> None:
+    stat = output_path.stat()
+    manifest = {"settings": settings, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "chunks": entries}
+    path = _manifest_path(output_path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = path.with_name(path.name + ".part")
+        partial_path.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(partial_path, path)
+    except OSError as e:
+        print(f"Warning: Could not save the chunk manifest for {output_path}: {e}", file=sys.stderr)
+
+
+# --- Cancellation ---
+class ConversionCancelled(Exception):
+    """Raised by the synthesis functions when their CancellationToken is cancelled."""
+
+
+class CancellationToken:
+    """
+    Lets one thread stop a conversion running in others.
+
+    The synthesis functions check the token between steps and while downloading, so cancelling aborts
+    the HTTP streams in flight, skips chunks not yet started and removes partial output files. A token
+    created with a parent is also cancelled when the parent is.
+    """
+
+    def __init__(self, parent: Optional["CancellationToken"] = None):
+        self._event = threading.Event()
+        self._parent = parent
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self._parent is not None and self._parent.cancelled)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise ConversionCancelled()
+
+    def sleep(self, seconds: float):
+        """Sleeps for up to seconds, raising ConversionCancelled as soon as the token is cancelled."""
+        deadline = time.monotonic() + seconds
+        while True:
+            self.raise_if_cancelled()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            # Short waits, so that cancelling a parent token is noticed too
+            self._event.wait(min(remaining, 0.1))
+
+
+def _sleep(seconds: float, cancel: Optional[CancellationToken]):
+    if cancel is None:
+        time.sleep(seconds)
+    else:
+        cancel.sleep(seconds)
+
+
+# --- Progress ---
+# Rough audio bytes per second of speech for each format, and characters spoken per second at 1.0x;
+# together they estimate how far into its text a chunk is before any chunk has finished
+AUDIO_BYTES_PER_SECOND = {"mp3": 16000, "opus": 4000, "aac": 16000, "flac": 30000, "wav": 48000, "pcm": 48000}
+SPOKEN_CHARACTERS_PER_SECOND = 14
+
+
+def expected_bytes_per_character(response_format: str, speed: float) -> Optional[float]:
+    """Returns roughly how many bytes of audio one character of text becomes, or None for an unknown format."""
+    bytes_per_second = AUDIO_BYTES_PER_SECOND.get(response_format)
+    if bytes_per_second is None:
+        return None
+    return bytes_per_second / (SPOKEN_CHARACTERS_PER_SECOND * speed)
+
+
+class TransferProgress:
+    """
+    Tracks how much audio a conversion has downloaded and reports it to a callback.
+
+    Download threads call add_bytes for every block received, so the callback sees a conversion
+    making progress even while a long chunk is still streaming. Reports are throttled to one per
+    interval and passed as a dict:
+
+        bytes (int): Audio bytes received so far, including retried and hedged requests.
+        bytes_per_second (float): Throughput over the last window seconds.
+        first_byte_seconds (float | None): Median time from sending a request to its first byte.
+            A high value with good throughput points to slow synthesis rather than a slow link.
+        characters_done (int), total_characters (int): Text synthesized so far and in total.
+        fraction_done (float): Estimated share of the text synthesized, from 0 to 1. Chunks still
+            downloading count by their audio received so far, converted to characters with the bytes per
+            character of the finished chunks, or with bytes_per_character until one has finished.
+        eta_seconds (float | None): Estimated time left, from the rate at which fraction_done has grown.
+    """
+
+    def __init__(self, total_characters: int, callback: Callable[[dict], None], interval: float = 0.25,
+                 window: float = 2.0, bytes_per_character: Optional[float] = None):
+        self.total_characters = total_characters
+        self.callback = callback
+        self.interval = interval
+        self.window = window
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._last_report = 0.0
+        self._bytes = 0
+        self._recent = deque()  # (time, bytes) of blocks received within the window
+        self._first_byte_samples = deque(maxlen=50)
+        self._characters_done = 0
+        self._bytes_done = 0  # Audio of the finished chunks
+        self.bytes_per_character = bytes_per_character
+
+    def add_bytes(self, count: int):
+        now = time.monotonic()
+        with self._lock:
+            self._bytes += count
+            self._recent.append((now, count))
+            report = now - self._last_report >= self.interval
+            if report:
+                self._last_report = now
+        if report:
+            self.callback(self.snapshot())
+
+    def first_byte(self, seconds: float):
+        with self._lock:
+            self._first_byte_samples.append(seconds)
+
+    def chunk_done(self, characters: int, audio_bytes: int = 0):
+        with self._lock:
+            self._characters_done += characters
+            self._bytes_done += audio_bytes
+            done = self._characters_done >= self.total_characters
+        if done:
+            self.callback(self.snapshot())
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and self._recent[0][0] < now - self.window:
+                self._recent.popleft()
+            elapsed = now - self._start
+            first_bytes = sorted(self._first_byte_samples)
+            characters_done = self._characters_done
+            ratio = self._bytes_done / characters_done if self._bytes_done else self.bytes_per_character
+            if ratio:
+                # Received audio includes retried and hedged requests, so it is kept short of finishing the text
+                remaining = self.total_characters - characters_done
+                characters_done += min(0.95 * remaining, max(self._bytes - self._bytes_done, 0) / ratio)
+            fraction = min(characters_done / self.total_characters, 1.0) if self.total_characters > 0 else 0.0
+            eta = elapsed * (1 - fraction) / fraction if fraction else None
+            return {
+                "bytes": self._bytes,
+                "bytes_per_second": sum(count for _, count in self._recent) / min(self.window, max(elapsed, 0.001)),
+                "first_byte_seconds": first_bytes[len(first_bytes) // 2] if first_bytes else None,
+                "characters_done": self._characters_done,
+                "total_characters": self.total_characters,
+                "fraction_done": fraction,
+                "eta_seconds": eta,
+            }
+
+
+def format_progress(progress: dict) -> str:
+    """Formats a TransferProgress report as one line, such as "1.2 MB at 340 KB/s, 45%, about 12s left"."""
+    def size(count: float) -> str:
+        for unit in ("B", "KB", "MB"):
+            if count < 1024 or unit == "MB":
+                return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+            count /= 1024
+
+    parts = [f"{size(progress['bytes'])} at {size(progress['bytes_per_second'])}/s"]
+    if progress["total_characters"]:
+        parts.append(f"{100 * progress['fraction_done']:.0f}%")
+    if progress["eta_seconds"] is not None:
+        parts.append(f"about {progress['eta_seconds']:.0f}s left")
+    if progress["first_byte_seconds"] is not None:
+        parts.append(f"first byte after {progress['first_byte_seconds']:.1f}s")
+    return ", ".join(parts)
+
+
+# --- Retries ---
+# Timeouts, dropped connections, rate limiting and server errors are worth retrying; anything else
+# (bad request, invalid key, unknown voice) fails the same way every time.
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Returns whether a failed speech request may succeed if sent again."""
+    import httpx
+    import openai
+    if isinstance(error, (openai.APIConnectionError, httpx.TransportError)):
+        return True  # Includes timeouts and connections dropped while the audio was streaming
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code in (401, 403, 404) and len(endpoint_pool.endpoints) > 1:
+            return True  # A bad key or a model missing on one endpoint; another endpoint may serve it
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parses rate limit reset durations such as "20ms", "1s" or "6m0s" into seconds."""
+    parts = _DURATION_PART_RE.findall(value or "")
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts) if parts else None
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Returns how long the server asked us to wait before retrying, or None if it did not say.
+
+    Looks at Retry-After (seconds or an HTTP date), retry-after-ms, and the x-ratelimit-reset-* header of
+    whichever request or token budget has run out.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            value = headers["retry-after"]
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass  # Malformed header, fall through to the rate limit headers
+    waits = [_parse_duration(headers.get(f"x-ratelimit-reset-{budget}")) for budget in ("requests", "tokens")
+             if headers.get(f"x-ratelimit-remaining-{budget}") == "0"]
+    waits = [wait for wait in waits if wait is not None]
+    return max(waits) if waits else None
+
+
+def call_with_retries(request: Callable[[float], bytes], deadline_seconds: float = REQUEST_DEADLINE_SECONDS,
+                      max_retries: int = MAX_RETRIES, cancel: Optional[CancellationToken] = None) -> bytes:
+    """
+    Calls request(timeout) until it succeeds, retrying retryable errors with exponential backoff.
+
+    The backoff uses full jitter, so that workers throttled together do not retry together, and never
+    waits less than the server asked for. Each attempt gets the time left before the deadline as its
+    timeout, and no retry is started that could not finish before it.
+
+    Args:
+        request (callable): Sends one request; receives the timeout in seconds for that attempt.
+        deadline_seconds (float): The total time allowed, including retries and waiting.
+        max_retries (int): The maximum number of attempts after the first.
+        cancel (CancellationToken, optional): Stops waiting for the next attempt when cancelled.
+
+    Returns:
+        bytes: The result of the first successful attempt.
+
+    Raises:
+        Exception: The last error, if it is not retryable or the retries or deadline are exhausted.
+    """
+    deadline = time.monotonic() + deadline_seconds
+    attempt = 0
+    while True:
         try:
-            # Try for Per-Monitor DPI Awareness V1
-            ctypes.windll.shcore.SetProcessDpiAwareness(1)
-        except (AttributeError, OSError):
+            return request(max(0.001, deadline - time.monotonic()))
+        except ConversionCancelled:
+            raise
+        except Exception as e:
+            delay = _retry_delay(e, attempt, max_retries, deadline)
+            if delay is None:
+                raise
+            attempt += 1
+            _sleep(delay, cancel)
+
+
+def _retry_delay(error: Exception, attempt: int, max_retries: int, deadline: float) -> Optional[float]:
+    """Returns how long to wait before retrying after error, or None if it should not be retried."""
+    if attempt >= max_retries or not is_retryable(error):
+        return None
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+    server_delay = retry_after_seconds(error)
+    if server_delay is not None:
+        delay = max(delay, server_delay + random.uniform(0, RETRY_BASE_DELAY))
+    if time.monotonic() + delay >= deadline:
+        return None
+    print(f"Speech request failed ({error}); retry {attempt + 1}/{max_retries} in {delay:.1f}s.", file=sys.stderr)
+    return delay
+
+
+# --- Adaptive Concurrency ---
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of speech requests in flight, adapting the limit AIMD-style.
+
+    Every healthy response raises the limit by 1/limit, about one extra request per round trip. A
+    throttled response (429 or 503), or a response much slower than usual for its length, multiplies
+    the limit by backoff. Requests that were sent together tend to be throttled together, so at most
+    one decrease happens per typical request duration.
+
+    The current limit is available as .limit, and together with other counters from metrics().
+    """
+
+    def __init__(self, initial: float, minimum: float = 1, maximum: float = 16, backoff: float = 0.5,
+                 latency_tolerance: float = 2.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._baseline = None  # Moving average of seconds per character
+        self._typical_duration = 1.0  # Moving average of request duration, in seconds
+        self._last_decrease = 0.0
+
+    def try_acquire(self) -> bool:
+        """Takes a slot if one is free, without waiting; EndpointPool waits for slots across all endpoints."""
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, outcome: str, duration: float, characters: int):
+        """
+        Returns a slot and adapts the limit.
+
+        Args:
+            outcome (str): "ok", "throttled", or "failed"/"error" for failures that say nothing about load.
+            duration (float): How long the request took, in seconds.
+            characters (int): The length of the request's text, to compare latency across chunk sizes.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == "throttled":
+                self.throttled += 1
+                self._decrease(now)
+            elif outcome == "ok":
+                # Short inputs are dominated by fixed overhead, so they are compared as if 200 characters long
+                seconds_per_char = duration / max(characters, 200)
+                if self._baseline is not None and seconds_per_char > self.latency_tolerance * self._baseline:
+                    self._decrease(now)
+                else:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self._baseline = seconds_per_char if self._baseline is None else 0.9 * self._baseline + 0.1 * seconds_per_char
+                self._typical_duration = 0.9 * self._typical_duration + 0.1 * duration
+
+    def _decrease(self, now: float):
+        if now - self._last_decrease < self._typical_duration:
+            return
+        self.limit = max(self.minimum, self.limit * self.backoff)
+        self._last_decrease = now
+
+    def metrics(self) -> dict:
+        return {"concurrency_limit": self.limit, "in_flight": self.in_flight, "throttled": self.throttled}
+
+
+# --- Rate Limiting ---
+class SharedTokenBucket:
+    """
+    Token buckets for requests and characters, shared between processes through a locked state file.
+
+    Each bucket refills continuously at its per-minute rate and holds at most burst_seconds worth of
+    tokens (never less than one request of MAX_INPUT_CHARS characters). A caller takes one request and
+    len(text) characters, waiting until both buckets have enough. Because the state lives in a file
+    under an exclusive lock, several processes sending with the same API key draw from one budget and
+    together stay at the limit instead of each assuming it has the whole budget to itself.
+    """
+
+    def __init__(self, path, requests_per_minute: float, characters_per_minute: float, burst_seconds: float = 10):
+        self.path = Path(path)
+        self.rates = {"requests": requests_per_minute / 60, "characters": characters_per_minute / 60}
+        self.capacities = {
+            "requests": max(1.0, self.rates["requests"] * burst_seconds),
+            "characters": max(float(MAX_INPUT_CHARS), self.rates["characters"] * burst_seconds),
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return any(rate > 0 for rate in self.rates.values())
+
+    def acquire(self, characters: int, cancel: Optional[CancellationToken] = None):
+        """Blocks until one request and the given number of characters can be sent."""
+        if not self.enabled:
+            return
+        while True:
+            wait = self._try_take({"requests": 1, "characters": characters})
+            if wait <= 0:
+                return
+            # Other processes may take tokens in the meantime, so check again rather than sleeping the whole wait
+            _sleep(min(wait, 1.0), cancel)
+
+    def try_acquire(self, characters: int) -> bool:
+        """Takes one request and the given number of characters if both are available now, without waiting."""
+        return not self.enabled or self._try_take({"requests": 1, "characters": characters}) <= 0
+
+    async def acquire_async(self, characters: int):
+        """Like acquire, but waits without blocking the event loop."""
+        import asyncio
+        if not self.enabled:
+            return
+        while True:
+            # Locking and reading the state file can wait on another process, so it runs off the event loop
+            wait = await asyncio.to_thread(self._try_take, {"requests": 1, "characters": characters})
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, 1.0))
+
+    def _try_take(self, costs: dict) -> float:
+        """Takes the tokens if all buckets have enough and returns 0, otherwise returns the seconds to wait."""
+        with self._lock, _locked_file(self.path) as state_file:
+            now = time.time()
             try:
-                # Try for System DPI Awareness
-                ctypes.windll.user32.SetProcessDPIAware()
-            except (AttributeError, OSError):
-                print("Warning: Could not set DPI awareness. GUI might appear blurry on high-DPI displays.")
+                state = json.loads(state_file.read() or b"{}")
+            except ValueError:
+                state = {}  # Corrupt or half-written by a killed process; start over with full buckets
+            elapsed = max(0.0, now - state.get("updated", now))
+            wait = 0.0
+            for name, rate in self.rates.items():
+                if rate <= 0:
+                    continue
+                tokens = min(self.capacities[name], state.get(name, self.capacities[name]) + elapsed * rate)
+                cost = min(costs[name], self.capacities[name])
+                state[name] = tokens
+                if tokens < cost:
+                    wait = max(wait, (cost - tokens) / rate)
+            if wait <= 0:
+                for name, rate in self.rates.items():
+                    if rate > 0:
+                        state[name] -= min(costs[name], self.capacities[name])
+            state["updated"] = now
+            state_file.seek(0)
+            state_file.truncate()
+            state_file.write(json.dumps(state).encode("utf-8"))
+            return wait
+
+
+# --- Endpoints ---
+def _http_transport_options(pool_size: int) -> dict:
+    """Returns the connection pool, keep-alive, HTTP/2 and timeout settings for a speech client."""
+    import httpx
+    pool_size = HTTP_POOL_SIZE or pool_size
+    http2 = HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("Warning: TTS_HTTP2 is set but the h2 package is not installed; using HTTP/1.1.", file=sys.stderr)
+            http2 = False
+    return {
+        # Keep as many idle connections as there are workers, so each request reuses a warm TLS session
+        "limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                               keepalive_expiry=HTTP_KEEPALIVE_SECONDS),
+        "http2": http2,
+        "timeout": httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    }
+
+
+def _request_timeout(remaining: float):
+    """Returns the timeouts for a request with remaining seconds left before its deadline: the configured ones, capped by it."""
+    import httpx
+    remaining = max(0.001, remaining)
+    return httpx.Timeout(min(HTTP_READ_TIMEOUT, remaining), connect=min(HTTP_CONNECT_TIMEOUT, remaining))
+
+
+class Endpoint:
+    """
+    One OpenAI-compatible speech API (base URL and key) with its own client, limits and health.
+
+    Each endpoint has its own connection pool, adaptive concurrency limit (capped at max_concurrency)
+    and rate budget, since providers enforce limits per key. Its OpenAI client is built on first use.
+    """
+
+    def __init__(self, name: str, base_url: str, api_key: str, weight: float = 1.0, max_concurrency: Optional[int] = None,
+                 requests_per_minute: float = REQUESTS_PER_MINUTE, characters_per_minute: float = CHARACTERS_PER_MINUTE):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.weight = weight
+        maximum = max_concurrency or MAX_CONCURRENCY
+        self.limiter = AdaptiveConcurrencyLimiter(min(MAX_WORKERS, maximum), maximum=maximum)
+        # The bucket file name is a hash, so the key itself is never written to disk
+        bucket_id = hashlib.sha256(f"{api_key}@{base_url}".encode("utf-8")).hexdigest()[:16]
+        self.rate_limiter = SharedTokenBucket(RATE_LIMIT_DIR / f"ratelimit-{bucket_id}.json", requests_per_minute, characters_per_minute)
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.client = None
+        self.http_client = None  # The connection pool under client
+        self._async_clients = {}  # Event loop -> AsyncOpenAI client, since async connections belong to one loop
+        self._client_lock = threading.Lock()
+
+    def get_client(self):
+        """Returns this endpoint's OpenAI client, creating it and its connection pool on the first call."""
+        if self.client is None:
+            with self._client_lock:
+                if self.client is None:
+                    from openai import OpenAI, DefaultHttpxClient
+                    self.http_client = DefaultHttpxClient(**_http_transport_options(int(self.limiter.maximum)))
+                    # Retries are handled by call_with_retries, which also honors the rate limit headers
+                    self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=self.http_client, max_retries=0)
+        return self.client
+
+    def get_async_client(self):
+        """Returns this endpoint's AsyncOpenAI client for the running event loop, creating it on the first call."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+                http_client = DefaultAsyncHttpxClient(**_http_transport_options(int(self.limiter.maximum)))
+                client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client, max_retries=0)
+                # Drop clients of event loops that have been closed, such as earlier asyncio.run calls
+                self._async_clients = {known: known_client for known, known_client in self._async_clients.items()
+                                       if not known.is_closed()}
+                self._async_clients[loop] = client
+        return client
+
+    def metrics(self) -> dict:
+        return {"name": self.name, "healthy": self.ejected_until <= time.monotonic(), **self.limiter.metrics()}
+
+
+class EndpointPool:
+    """
+    Spreads speech requests over several endpoints.
+
+    acquire picks, among the endpoints that are in rotation and below their concurrency limit, the
+    one with the fewest requests in flight relative to its weight, waiting if all of them are full.
+    release reports the outcome: throttling and slow responses shrink that endpoint's limit, and an
+    endpoint that fails EJECT_AFTER_FAILURES requests in a row is ejected for EJECT_SECONDS. When
+    every endpoint is ejected, the one due back first is still used, so requests never stall.
+    """
+
+    def __init__(self, endpoints: list):
+        self.endpoints = endpoints
+        self._condition = threading.Condition()
+
+    @property
+    def max_concurrency(self) -> int:
+        return sum(int(endpoint.limiter.maximum) for endpoint in self.endpoints)
+
+    def acquire(self, cancel: Optional[CancellationToken] = None) -> Endpoint:
+        with self._condition:
+            while True:
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                endpoint = self._try_acquire()
+                if endpoint is not None:
+                    return endpoint
+                # Also wake up now and then, since neither an ejection ending nor a cancellation notifies
+                self._condition.wait(timeout=0.05 if cancel is not None else 1.0)
+
+    async def acquire_async(self) -> Endpoint:
+        """Like acquire, but waits without blocking the event loop."""
+        import asyncio
+        while True:
+            with self._condition:
+                endpoint = self._try_acquire()
+            if endpoint is not None:
+                return endpoint
+            await asyncio.sleep(0.02)
+
+    def try_acquire(self) -> Optional[Endpoint]:
+        """Takes a slot on an endpoint if one is free now, without waiting; returns None otherwise."""
+        with self._condition:
+            return self._try_acquire()
+
+    def _try_acquire(self) -> Optional[Endpoint]:
+        if not self.endpoints:
+            raise ConfigurationError(CONFIGURATION_ERROR or "No API endpoints are configured.")
+        now = time.monotonic()
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.ejected_until <= now]
+        if not candidates:
+            candidates = [min(self.endpoints, key=lambda endpoint: endpoint.ejected_until)]
+        candidates.sort(key=lambda endpoint: ((endpoint.limiter.in_flight + 1) / endpoint.weight, random.random()))
+        for endpoint in candidates:
+            if endpoint.limiter.try_acquire():
+                return endpoint
+        return None
+
+    def release(self, endpoint: Endpoint, outcome: str, duration: float, characters: int):
+        """
+        Returns endpoint's slot.
+
+        outcome is "ok", "throttled", "failed" (the endpoint's fault), "error" (the request's fault) or
+        "cancelled" (the result was no longer wanted).
+        """
+        endpoint.limiter.release(outcome, duration, characters)
+        with self._condition:
+            if outcome == "failed":
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= EJECT_AFTER_FAILURES:
+                    endpoint.ejected_until = time.monotonic() + EJECT_SECONDS
+                    endpoint.consecutive_failures = 0
+                    print(f"Endpoint {endpoint.name} failed {EJECT_AFTER_FAILURES} requests in a row; "
+                          f"out of rotation for {EJECT_SECONDS:.0f}s.", file=sys.stderr)
+            elif outcome in ("ok", "throttled"):
+                endpoint.consecutive_failures = 0
+            self._condition.notify_all()
+
+    def metrics(self) -> list:
+        return [endpoint.metrics() for endpoint in self.endpoints]
+
+
+class ConfigurationError(Exception):
+    """Raised when the endpoint settings in the environment are invalid."""
+
+
+_ENDPOINT_KEYS = {"name", "base_url", "api_key", "api_key_env", "weight", "max_concurrency", "requests_per_minute",
+                  "characters_per_minute"}
+
+
+def _load_endpoints() -> list:
+    """
+    Builds the endpoints from TTS_ENDPOINTS, or a single endpoint from OPENAI_API_KEY and OPENAI_BASE_URL.
+
+    TTS_ENDPOINTS is a JSON list of objects with the keys base_url, api_key (or api_key_env, the name of
+    an environment variable holding it), and optionally name, weight, max_concurrency,
+    requests_per_minute and characters_per_minute. For example:
+        [{"api_key_env": "OPENAI_KEY_A", "weight": 2}, {"api_key_env": "OPENAI_KEY_B"},
+         {"name": "local", "base_url": "http://localhost:8880/v1", "api_key": "unused", "max_concurrency": 2}]
+    """
+    if not ENDPOINTS_JSON:
+        return [Endpoint("default", OPENAI_BASE_URL, OPENAI_API_KEY)]
+    try:
+        entries = json.loads(ENDPOINTS_JSON)
+    except ValueError as e:
+        raise ConfigurationError(f"TTS_ENDPOINTS is not valid JSON: {e}") from None
+    if not isinstance(entries, list) or not entries:
+        raise ConfigurationError("TTS_ENDPOINTS must be a non-empty JSON list of endpoint objects.")
+    endpoints = []
+    for index, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            raise ConfigurationError(f"TTS_ENDPOINTS entry {index} is not a JSON object.")
+        unknown = set(entry) - _ENDPOINT_KEYS
+        if unknown:
+            raise ConfigurationError(f"TTS_ENDPOINTS entry {index} has unknown keys: {', '.join(sorted(unknown))}.")
+        api_key = entry.get("api_key")
+        if not api_key:
+            key_variable = entry.get("api_key_env", "OPENAI_API_KEY")
+            api_key = os.getenv(key_variable)
+            if not api_key:
+                raise ConfigurationError(f"TTS_ENDPOINTS entry {index} takes its API key from {key_variable}, which is not set.")
+        try:
+            weight = float(entry.get("weight", 1.0))
+            max_concurrency = int(entry["max_concurrency"]) if entry.get("max_concurrency") is not None else None
+            requests_per_minute = float(entry.get("requests_per_minute", REQUESTS_PER_MINUTE))
+            characters_per_minute = float(entry.get("characters_per_minute", CHARACTERS_PER_MINUTE))
+        except (TypeError, ValueError) as e:
+            raise ConfigurationError(f"TTS_ENDPOINTS entry {index} has a value that is not a number: {e}") from None
+        if weight <= 0 or (max_concurrency is not None and max_concurrency < 1) or requests_per_minute < 0 or characters_per_minute < 0:
+            raise ConfigurationError(f"TTS_ENDPOINTS entry {index} needs a positive weight and max_concurrency, "
+                                     f"and rate limits of 0 (unlimited) or more.")
+        endpoints.append(Endpoint(
+            str(entry.get("name", f"endpoint-{index}")), entry.get("base_url", OPENAI_BASE_URL), api_key,
+            weight=weight, max_concurrency=max_concurrency, requests_per_minute=requests_per_minute,
+            characters_per_minute=characters_per_minute))
+    return endpoints
+
+
+def _configuration_problem() -> str:
+    """Describes why API_CONFIGURED is False."""
+    return CONFIGURATION_ERROR or "OPENAI_API_KEY is not set. Please set it in the .env file."
+
+
+try:
+    endpoint_pool = EndpointPool(_load_endpoints())
+except ConfigurationError as e:
+    # Reported by the GUI and the command line, and raised on first use, rather than failing the import
+    CONFIGURATION_ERROR = str(e)
+    API_CONFIGURED = False
+    endpoint_pool = EndpointPool([])
+
+
+def get_client():
+    """Returns the OpenAI client of the first endpoint, creating it on the first call."""
+    if not endpoint_pool.endpoints:
+        raise ConfigurationError(_configuration_problem())
+    return endpoint_pool.endpoints[0].get_client()
+
+
+def warm_up_connection() -> bool:
+    """
+    Opens, or refreshes, a pooled connection to each API endpoint.
+
+    Sends an unauthenticated HEAD request to each base URL: whatever the response, the DNS lookup, TCP
+    connection and TLS handshake are done and the connection stays in the pool for the next request.
+
+    Returns:
+        bool: True if every endpoint could be reached.
+    """
+    reached = True
+    for endpoint in endpoint_pool.endpoints:
+        endpoint.get_client()
+        try:
+            endpoint.http_client.head(endpoint.base_url, timeout=HTTP_CONNECT_TIMEOUT)
+        except Exception as e:  # Best effort; a real request reports connection problems properly
+            print(f"Warning: Could not pre-connect to {endpoint.base_url}: {e}", file=sys.stderr)
+            reached = False
+    return reached
+
+
+def _request_outcome(error: Exception) -> str:
+    """Classifies a failed request for EndpointPool.release."""
+    if isinstance(error, ConversionCancelled):
+        return "cancelled"
+    status_code = getattr(error, "status_code", None)
+    if status_code in (429, 503):
+        return "throttled"
+    if status_code in (400, 413, 422):
+        return "error"  # The input was rejected; another endpoint would reject it too
+    return "failed"
+
+
+# --- Request Coalescing ---
+class SingleFlight:
+    """
+    Lets concurrent callers asking for the same key share one call.
+
+    The first caller for a key runs the function; callers arriving while it is still running wait for
+    it and receive the same result, or the same exception. Nothing is remembered once the call ends;
+    repeated requests over time are the cache's job. A waiting caller whose own cancel token is
+    cancelled stops waiting without affecting the call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0  # Callers that were served by another caller's request
+
+    def do(self, key, function: Callable[[], bytes], cancel: Optional[CancellationToken] = None) -> bytes:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            while cancel is not None and not wait([future], timeout=0.1).done:
+                cancel.raise_if_cancelled()
+            return future.result()
+        try:
+            result = function()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
 
-# --- Configuration ---
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-# OpenAI's base URL
-OPENAI_BASE_URL = "https://api.openai.com/v1"
 
-# --- Initialize OpenAI Client ---
-# We configure the OpenAI client to point to OpenAI's API endpoint.
-client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+speech_flights = SingleFlight()
 
-pygame.mixer.init()  # Initialize pygame mixer
+
+# --- Hedging ---
+class HedgePolicy:
+    """
+    Decides when a slow speech request gets a duplicate.
+
+    Recent request latencies are kept per character (short inputs counted as 200 characters, as their
+    time is mostly fixed overhead). Once min_samples are known, a request that has run longer than the
+    percentile of that history, scaled to its length, may be hedged. Every request adds max_extra to a
+    small budget and every hedge spends 1 from it, so hedges never add more than max_extra extra load.
+    """
+
+    def __init__(self, enabled: bool = HEDGE_REQUESTS, percentile: float = HEDGE_PERCENTILE, max_extra: float = HEDGE_MAX_EXTRA,
+                 history: int = 200, min_samples: int = 20):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_extra = max_extra
+        self.min_samples = min_samples
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._samples = deque(maxlen=history)
+        self._budget = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, duration: float, characters: int):
+        with self._lock:
+            self._samples.append(duration / max(characters, 200))
+
+    def delay(self, characters: int) -> Optional[float]:
+        """Returns how long to wait before hedging a request of this length, or None if hedging is off or there is too little history."""
+        with self._lock:
+            if not self.enabled or len(self._samples) < self.min_samples:
+                return None
+            self._budget = min(10.0, self._budget + self.max_extra)
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))] * max(characters, 200)
+
+    def can_hedge(self) -> bool:
+        with self._lock:
+            return self._budget >= 1
+
+    def try_hedge(self) -> bool:
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            self.hedges += 1
+            return True
+
+
+hedge_policy = HedgePolicy()
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _hedged_request(text_input: str, model: str, voice: str, speed: float, response_format: str, timeout: float,
+                    cancel: Optional[CancellationToken] = None, progress: Optional[TransferProgress] = None) -> bytes:
+    """
+    Sends a speech request, and a duplicate if it runs longer than hedge_policy allows.
+
+    Whichever copy finishes first wins; the other is cancelled. If the first to finish failed, the
+    other copy's result is used instead. The delay counts from when the request was actually sent, not
+    from when it started waiting for a slot or the rate budget, and the duplicate is only sent if an
+    endpoint slot and rate budget are free at once; otherwise it would queue behind the same backlog.
+    """
+    delay = hedge_policy.delay(len(text_input))
+    if delay is None or delay >= timeout:
+        return _limited_request(text_input, model, voice, speed, response_format, timeout, cancel, progress)
+
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=2 * endpoint_pool.max_concurrency, thread_name_prefix="hedge")
+    deadline = time.monotonic() + timeout
+    tokens = {"primary": CancellationToken(cancel), "hedge": CancellationToken(cancel)}
+    sent = threading.Event()
+    attempts = {"primary": _hedge_executor.submit(_limited_request, text_input, model, voice, speed, response_format, timeout,
+                                                 tokens["primary"], progress, sent)}
+    attempts["primary"].add_done_callback(lambda attempt: sent.set())  # Also if it failed before being sent
+    sent.wait()
+    done, _ = wait(attempts.values(), timeout=delay)
+    if not done and hedge_policy.can_hedge():
+        endpoint = endpoint_pool.try_acquire()
+        if endpoint is not None:
+            if endpoint.rate_limiter.try_acquire(len(text_input)) and hedge_policy.try_hedge():
+                attempts["hedge"] = _hedge_executor.submit(_limited_request, text_input, model, voice, speed, response_format,
+                                                           max(0.001, deadline - time.monotonic()), tokens["hedge"], progress,
+                                                           None, endpoint)
+            else:
+                endpoint_pool.release(endpoint, "cancelled", 0.0, len(text_input))
+
+    pending = set(attempts.values())
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        finished = next((attempt for attempt in done if attempt.exception() is None), None)
+        if finished is None and pending:
+            continue  # The first copy to finish failed; the other may still succeed
+        finished = finished or next(iter(done))
+        for name, attempt in attempts.items():
+            if attempt is not finished:
+                tokens[name].cancel()
+            elif name == "hedge":
+                hedge_policy.hedge_wins += 1
+        return finished.result()
+
+
+# --- Synthesis ---
+def _request_speech(client, text_input: str, model: str, voice: str, speed: float, response_format: str, timeout: float,
+                    cancel: Optional[CancellationToken] = None, progress: Optional[TransferProgress] = None) -> bytes:
+    """Sends a single speech request and returns the encoded audio. Cancelling stops the download."""
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    start = time.monotonic()
+    with client.audio.speech.with_streaming_response.create(
+        model=model,
+        voice=voice,
+        input=text_input,
+        speed=speed,
+        response_format=response_format,
+        timeout=_request_timeout(timeout)
+    ) as response:
+        audio = bytearray()
+        for data in response.iter_bytes():
+            if cancel is not None:
+                cancel.raise_if_cancelled()  # Leaving the with block closes the connection mid-stream
+            if progress is not None:
+                if not audio:
+                    progress.first_byte(time.monotonic() - start)
+                progress.add_bytes(len(data))
+            audio += data
+        return bytes(audio)
+
+
+def _limited_request(text_input: str, model: str, voice: str, speed: float, response_format: str, timeout: float,
+                     cancel: Optional[CancellationToken] = None, progress: Optional[TransferProgress] = None,
+                     sent: Optional[threading.Event] = None, endpoint: Optional[Endpoint] = None) -> bytes:
+    """
+    Sends a speech request to the endpoint chosen by endpoint_pool, within its rate budget, and reports the outcome.
+
+    sent, if given, is set once the request goes out, after any waiting for a slot and the rate budget.
+    An endpoint passed in already has the slot and the rate budget for this request taken.
+    """
+    budget_taken = endpoint is not None
+    if endpoint is None:
+        endpoint = endpoint_pool.acquire(cancel)
+    start = None
+    outcome = "error"
+    try:
+        if not budget_taken:
+            endpoint.rate_limiter.acquire(len(text_input), cancel)
+        if sent is not None:
+            sent.set()
+        start = time.monotonic()  # Time spent waiting for the rate budget is not the endpoint's latency
+        audio = _request_speech(endpoint.get_client(), text_input, model, voice, speed, response_format, timeout, cancel,
+                                progress)
+        outcome = "ok"
+        hedge_policy.record(time.monotonic() - start, len(text_input))
+        return audio
+    except Exception as e:
+        outcome = _request_outcome(e)
+        raise
+    finally:
+        endpoint_pool.release(endpoint, outcome, time.monotonic() - (start or time.monotonic()), len(text_input))
+
+
+def _stream_chunk(text_input: str, model: str, voice: str, speed: float, response_format: str,
+                  cancel: Optional[CancellationToken] = None, progress: Optional[TransferProgress] = None):
+    """
+    Sends one speech request and yields its audio blocks as they arrive.
+
+    Unlike _synthesize_chunk, a failure is only retried while nothing has been yielded yet, since the
+    caller may already have played or sent the first part. The request is not hedged or coalesced.
+    """
+    deadline = time.monotonic() + REQUEST_DEADLINE_SECONDS
+    attempt = 0
+    while True:
+        endpoint = endpoint_pool.acquire(cancel)
+        start = None
+        outcome = "cancelled"  # Unless set below; also covers the caller closing the generator early
+        received = 0
+        try:
+            endpoint.rate_limiter.acquire(len(text_input), cancel)
+            start = time.monotonic()
+            with endpoint.get_client().audio.speech.with_streaming_response.create(
+                model=model,
+                voice=voice,
+                input=text_input,
+                speed=speed,
+                response_format=response_format,
+                timeout=_request_timeout(deadline - time.monotonic())
+            ) as response:
+                for data in response.iter_bytes():
+                    if cancel is not None:
+                        cancel.raise_if_cancelled()
+                    if progress is not None:
+                        if not received:
+                            progress.first_byte(time.monotonic() - start)
+                        progress.add_bytes(len(data))
+                    received += len(data)
+                    yield data
+            outcome = "ok"
+            return
+        except ConversionCancelled:
+            raise
+        except Exception as e:
+            outcome = _request_outcome(e)
+            delay = None if received else _retry_delay(e, attempt, MAX_RETRIES, deadline)
+            if delay is None:
+                raise
+        finally:
+            endpoint_pool.release(endpoint, outcome, time.monotonic() - (start or time.monotonic()), len(text_input))
+        attempt += 1
+        _sleep(delay, cancel)
+
+
+def _synthesize_chunk(text_input: str, model: str, voice: str, speed: float, response_format: str,
+                      cancel: Optional[CancellationToken] = None, progress: Optional[TransferProgress] = None) -> bytes:
+    """
+    Synthesizes a single chunk of at most MAX_INPUT_CHARS characters, retrying transient failures.
+
+    Identical chunks requested at the same time, by other documents or by repeated text within one,
+    share a single request.
+    """
+    def request():
+        return call_with_retries(
+            lambda timeout: _hedged_request(text_input, model, voice, speed, response_format, timeout, cancel, progress),
+            cancel=cancel)
+
+    while True:
+        try:
+            audio = speech_flights.do((text_input, model, voice, float(speed), response_format), request, cancel)
+            if progress is not None:
+                progress.chunk_done(len(text_input), len(audio))
+            return audio
+        except ConversionCancelled:
+            if cancel is not None and cancel.cancelled:
+                raise
+            # The shared request was cancelled by the caller that started it, not by us; start our own
+
+
+def _split_for_synthesis(text_input: str, response_format: str, first_chunk_chars: Optional[int]) -> list:
+    """Splits text with split_text, raising ValueError if it is blank or its chunks could not be joined."""
+    chunks = split_text(text_input, first_limit=first_chunk_chars)
+    if not chunks:
+        raise ValueError("No text to synthesize.")
+    if len(chunks) > 1 and response_format not in CONCATENABLE_FORMATS:
+        raise ValueError(f"Text longer than {MAX_INPUT_CHARS} characters cannot be synthesized as {response_format}; "
+                         f"use one of: {', '.join(CONCATENABLE_FORMATS)}.")
+    return chunks
+
+
+def _copy_from_cache(cache_key: str, response_format: str, output_path: Path, on_chunk,
+                     manifest_settings: Optional[dict] = None) -> bool:
+    """
+    Copies the cached audio for cache_key to output_path, returning False on a cache miss.
+
+    With manifest_settings, the chunk layout stored with the entry becomes output_path's manifest, so
+    that the next edit of the text is still synthesized incrementally.
+    """
+    cached_path = synthesis_cache.get(cache_key, response_format)
+    if not cached_path:
+        return False
+    layout = synthesis_cache.layout(cache_key) if manifest_settings is not None else None
+    partial_path = output_path.with_name(output_path.name + ".part")
+    shutil.copyfile(cached_path, partial_path)
+    os.replace(partial_path, output_path)
+    # The layout is checked against the copy, in case the entry was replaced since it was read
+    if layout and layout[-1]["offset"] + layout[-1]["length"] == output_path.stat().st_size:
+        _save_manifest(output_path, manifest_settings, layout)
+    if on_chunk:
+        on_chunk(0, 1, output_path.read_bytes())
+    return True
+
+
+def synthesize_document(text_input: str, output_path, model: str = "tts-1", voice: str = "alloy", speed: float = 1.0,
+                        response_format: str = "mp3", max_workers: Optional[int] = None,
+                        first_chunk_chars: Optional[int] = None,
+                        on_chunk: Optional[Callable[[int, int, bytes], None]] = None, use_cache: bool = True,
+                        incremental: bool = True, cancel: Optional[CancellationToken] = None,
+                        on_progress: Optional[Callable[[dict], None]] = None) -> Path:
+    """
+    Synthesizes text of any length into a single audio file.
+
+    The text is split with split_text, the chunks are synthesized concurrently on a pool of at most
+    max_workers threads (further limited by endpoint_pool), and the results are written to the output
+    file in reading order. Chunks that finish early are held back until every chunk before them has
+    been written, so on_chunk sees the audio as one gapless sequence and can start playing it before
+    the whole document is done.
+
+    Unless use_cache is False, a request identical to an earlier one is answered from synthesis_cache
+    without calling the API. Unless incremental is False, converting edited text to the same output
+    file only synthesizes the chunks whose text changed and copies the rest from the previous output.
+
+    Args:
+        text_input (str): The text to convert to speech.
+        output_path (str | Path): The file to write the audio to.
+        model (str): The TTS model to use.
+        voice (str): The voice to use.
+        speed (float): The playback speed.
+        response_format (str): The audio format requested from the API.
+        max_workers (int, optional): The maximum number of concurrent requests for this document.
+                                     Defaults to the combined concurrency limit of all endpoints.
+        first_chunk_chars (int, optional): A smaller size for the first chunk, to shorten time-to-first-audio.
+        on_chunk (callable, optional): Called as on_chunk(index, chunk_count, audio_bytes) for each chunk, in order.
+                                       A cache hit is delivered as a single chunk.
+        use_cache (bool): Whether to consult and fill synthesis_cache.
+        incremental (bool): Whether to reuse unchanged chunks from the previous conversion to output_path.
+        cancel (CancellationToken, optional): Cancelling it aborts the conversion and leaves output_path as it was.
+        on_progress (callable, optional): Called from the download threads with a TransferProgress report
+                                          while audio is being received. Not called for cache hits.
+
+    Returns:
+        Path: The path to the written audio file.
+
+    Raises:
+        ValueError: If the text is blank, or needs several chunks in a format that cannot be concatenated.
+        ConversionCancelled: If cancel was cancelled.
+    """
+    chunks = _split_for_synthesis(text_input, response_format, first_chunk_chars)
+
+    output_path = Path(output_path)
+    use_cache = use_cache and synthesis_cache.max_bytes > 0
+    cache_key = SynthesisCache.key(text_input, model, voice, speed, response_format) if use_cache else None
+    manifest_settings = _manifest_settings(model, voice, speed, response_format) if incremental else None
+    if cache_key and _copy_from_cache(cache_key, response_format, output_path, on_chunk, manifest_settings):
+        return output_path
+
+    # The same conversion started by another process waits here, then finds the result in the cache
+    with _locked_file(synthesis_cache.lock_path(cache_key)) if cache_key else nullcontext():
+        if cache_key and _copy_from_cache(cache_key, response_format, output_path, on_chunk, manifest_settings):
+            return output_path
+        progress = TransferProgress(sum(len(chunk) for chunk in chunks), on_progress,
+                                    bytes_per_character=expected_bytes_per_character(response_format, speed)) \
+            if on_progress else None
+        layout = _synthesize_chunks_to_file(chunks, output_path, model, voice, speed, response_format, max_workers,
+                                            on_chunk, incremental, cancel, progress)
+        if cache_key:
+            try:
+                synthesis_cache.put(cache_key, response_format, output_path, layout)
+            except OSError as e:
+                print(f"Warning: Could not store speech in the cache at {synthesis_cache.directory}: {e}", file=sys.stderr)
+    return output_path
+
+
+def _synthesize_chunks_to_file(chunks: list, output_path: Path, model: str, voice: str, speed: float, response_format: str,
+                               max_workers: Optional[int], on_chunk, incremental: bool, cancel: Optional[CancellationToken],
+                               progress: Optional[TransferProgress] = None):
+    """
+    Synthesizes chunks concurrently and writes them to output_path in order, reusing unchanged ones if incremental.
+
+    Returns the manifest entries describing where each chunk's audio sits in output_path.
+    """
+    # Cancelled by the caller, or by us when any chunk fails, so the other workers stop downloading at once
+    workers_cancel = CancellationToken(cancel)
+    partial_path = output_path.with_name(output_path.name + ".part")
+    settings = _manifest_settings(model, voice, speed, response_format)
+    previous_chunks = _load_manifest(output_path, settings) if incremental else {}
+    hashes = [_chunk_hash(chunk) for chunk in chunks]
+    entries = []
+    max_workers = max_workers or endpoint_pool.max_concurrency
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        if progress is not None:
+            # Reused chunks take no time, so leaving them in would make the time estimate too optimistic
+            progress.total_characters -= sum(len(chunk) for chunk, chunk_hash in zip(chunks, hashes)
+                                             if chunk_hash in previous_chunks)
+        futures = {index: executor.submit(_synthesize_chunk, chunk, model, voice, speed, response_format, workers_cancel,
+                                          progress)
+                   for index, (chunk, chunk_hash) in enumerate(zip(chunks, hashes)) if chunk_hash not in previous_chunks}
+        try:
+            # The previous output stays in place until the new one replaces it, so reused chunks are read from it
+            with open(partial_path, "wb") as output_file, \
+                    (open(output_path, "rb") if previous_chunks else io.BytesIO()) as previous_file:
+                # Results are consumed in reading order, so chunks that finish early wait here for their turn
+                for index, chunk_hash in enumerate(hashes):
+                    if index in futures:
+                        audio = futures[index].result()
+                    else:
+                        offset, length = previous_chunks[chunk_hash]
+                        previous_file.seek(offset)
+                        audio = previous_file.read(length)
+                    entries.append({"hash": chunk_hash, "offset": output_file.tell(), "length": len(audio)})
+                    output_file.write(audio)
+                    if on_chunk:
+                        on_chunk(index, len(chunks), audio)
+        except BaseException:
+            workers_cancel.cancel()
+            for future in futures.values():
+                future.cancel()
+            partial_path.unlink(missing_ok=True)
+            raise
+    os.replace(partial_path, output_path)
+    if incremental:
+        _save_manifest(output_path, settings, entries)
+    return entries
+
+
+def iter_speech(text_input: str, model: str = "tts-1", voice: str = "alloy", speed: float = 1.0,
+                response_format: str = "mp3", max_workers: Optional[int] = None,
+                first_chunk_chars: Optional[int] = FIRST_CHUNK_CHARS, use_cache: bool = False,
+                cancel: Optional[CancellationToken] = None, on_progress: Optional[Callable[[dict], None]] = None,
+                stream_first_chunk: bool = False):
+    """
+    Synthesizes text of any length, yielding the audio in order as it arrives, without writing any file.
+
+    Works like synthesize_document with on_chunk, but hands the audio to the caller instead of a file:
+    chunks are synthesized concurrently and each is yielded as soon as it and every chunk before it
+    are done, so the caller can forward or play the audio while the rest is still being synthesized.
+    The first chunk is kept short so that the first audio arrives quickly, and with stream_first_chunk
+    its audio is yielded block by block as it comes off the network, so the first audio is available
+    about one time-to-first-byte after the call. Closing the generator early cancels the outstanding
+    requests.
+
+    Args:
+        text_input (str): The text to convert to speech.
+        model (str): The TTS model to use.
+        voice (str): The voice to use.
+        speed (float): The playback speed.
+        response_format (str): The audio format requested from the API.
+        max_workers (int, optional): The maximum number of concurrent requests.
+                                     Defaults to the combined concurrency limit of all endpoints.
+        first_chunk_chars (int, optional): A smaller size for the first chunk, see split_text.
+        use_cache (bool): Whether to consult and fill synthesis_cache, which is kept on disk. Off by default,
+                          so that nothing is written.
+        cancel (CancellationToken, optional): Cancelling it aborts the conversion.
+        on_progress (callable, optional): Receives download progress reports, see TransferProgress.
+        stream_first_chunk (bool): Whether to yield the first chunk's audio as it arrives. A failure
+                                   after its first bytes cannot be retried and is raised instead.
+
+    Yields:
+        bytes: Consecutive pieces of the encoded audio.
+
+    Raises:
+        ValueError: If the text is blank, or needs several chunks in a format that cannot be concatenated.
+        ConversionCancelled: If cancel was cancelled.
+    """
+    chunks = _split_for_synthesis(text_input, response_format, first_chunk_chars)
+    use_cache = use_cache and synthesis_cache.max_bytes > 0
+    cache_key = SynthesisCache.key(text_input, model, voice, speed, response_format) if use_cache else None
+    cached_path = synthesis_cache.get(cache_key, response_format) if cache_key else None
+    if cached_path:
+        try:
+            cached_file = open(cached_path, "rb")
+        except OSError:
+            pass  # Evicted in the meantime
+        else:
+            with cached_file:
+                yield from iter(lambda: cached_file.read(65536), b"")
+            return
+
+    workers_cancel = CancellationToken(cancel)
+    progress = TransferProgress(sum(len(chunk) for chunk in chunks), on_progress,
+                                bytes_per_character=expected_bytes_per_character(response_format, speed)) \
+        if on_progress else None
+    max_workers = max_workers or endpoint_pool.max_concurrency
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))))
+
+    def submit(remaining: list) -> list:
+        return [executor.submit(_synthesize_chunk, chunk, model, voice, speed, response_format, workers_cancel, progress)
+                for chunk in remaining]
+
+    def pieces():
+        if not stream_first_chunk:
+            futures = submit(chunks)
+        else:
+            # The other chunks are submitted once the first is under way, so they cannot take the slot it needs
+            futures = None
+            first_size = 0
+            for block in _stream_chunk(chunks[0], model, voice, speed, response_format, workers_cancel, progress):
+                if futures is None:
+                    futures = submit(chunks[1:])
+                first_size += len(block)
+                yield block
+            if futures is None:
+                futures = submit(chunks[1:])
+            if progress is not None:
+                progress.chunk_done(len(chunks[0]), first_size)
+        for future in futures:
+            yield future.result()
+
+    audio_pieces = pieces()
+    try:
+        # Kept for the cache while the audio fits in it
+        parts = [] if cache_key else None
+        size = 0
+        for audio in audio_pieces:
+            size += len(audio)
+            if parts is not None and size <= synthesis_cache.max_bytes:
+                parts.append(audio)
+            else:
+                parts = None
+            yield audio
+        if parts is not None:
+            try:
+                synthesis_cache.put_bytes(cache_key, response_format, b"".join(parts))
+            except OSError as e:
+                print(f"Warning: Could not store speech in the cache at {synthesis_cache.directory}: {e}", file=sys.stderr)
+    finally:
+        # Also reached when the caller stops iterating early or a chunk fails: stop the remaining requests
+        workers_cancel.cancel()
+        audio_pieces.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def write_speech(text_input: str, file, **options) -> int:
+    """
+    Synthesizes text of any length into a writable binary file-like object, such as a socket file or BytesIO.
+
+    Each piece of audio is written as soon as it is available, see iter_speech.
+
+    Args:
+        text_input (str): The text to convert to speech.
+        file: An object with a write(bytes) method.
+        **options: Passed on to iter_speech, such as model, voice, speed or response_format.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    written = 0
+    for audio in iter_speech(text_input, **options):
+        file.write(audio)
+        written += len(audio)
+    return written
 
 
 def text_to_speech(text_input: str, output_filename: str = "speech_output.mp3", model: str = "tts-1", voice: str = "alloy"):
@@ -54,8 +1641,8 @@ def text_to_speech(text_input: str, output_filename: str = "speech_output.mp3",
     Returns:
         Path: The path to the saved audio file, or None if an error occurred.
     """
-    if not OPENAI_API_KEY:
-        print("Error: OPENAI_API_KEY is not set. Please set it in the .env file.")
+    if not API_CONFIGURED:
+        print(f"Error: {_configuration_problem()}")
         return None
 
     speech_file_path = Path(__file__).parent / output_filename
@@ -65,15 +1652,8 @@ def text_to_speech(text_input: str, output_filename: str = "speech_output.mp3",
     print(f"Saving to: {speech_file_path}")
 
     try:
-        # Call OpenAI's /v1/audio/speech endpoint
-        response = client.audio.speech.create(
-            model=model,
-            voice=voice,
-            input=text_input
-        )
-
-        # Stream the audio content to a file
-        response.stream_to_file(speech_file_path)
+        # Call OpenAI's /v1/audio/speech endpoint, one request per chunk for long text
+        synthesize_document(text_input, speech_file_path, model=model, voice=voice)
         print(f"Speech successfully saved to {speech_file_path}")
         return speech_file_path
     except Exception as e:
@@ -82,7 +1662,10 @@ def text_to_speech(text_input: str, output_filename: str = "speech_output.mp3",
         return None
 
 
-def text_to_speech_gui(text_input: str, output_filename: str, model: str, voice: str, speed: float):
+def text_to_speech_gui(text_input: str, output_filename: str, model: str, voice: str, speed: float,
+                       on_chunk: Optional[Callable[[int, int, bytes], None]] = None,
+                       cancel: Optional[CancellationToken] = None, on_progress: Optional[Callable[[dict], None]] = None,
+                       on_pcm: Optional[Callable[[bytes], None]] = None):
     """
     Converts text to speech using OpenAI's API, designed for GUI integration.
 
@@ -92,14 +1675,21 @@ def text_to_speech_gui(text_input: str, output_filename: str, model: str, voice:
         model (str): The TTS model to use.
         voice (str): The voice to use.
         speed (float): The playback speed.
+        on_chunk (callable, optional): Receives each chunk's audio in order as soon as it is available,
+                                       see synthesize_document. Enables playing while converting.
+        cancel (CancellationToken, optional): Cancelling it aborts the conversion.
+        on_progress (callable, optional): Receives download progress reports, see TransferProgress.
+        on_pcm (callable, optional): Enables low-latency mode: raw PCM audio (see PCM_SAMPLE_RATE) is requested
+                                     and passed to on_pcm block by block as it arrives, and the result is
+                                     saved as a WAV file next to output_filename instead.
 
     Returns:
         tuple[bool, str]: (success, message_or_filepath)
                           If success is True, message_or_filepath is the path to the audio file.
                           If success is False, message_or_filepath is an error message.
     """
-    if not OPENAI_API_KEY:
-        return False, "Error: OPENAI_API_KEY is not set."
+    if not API_CONFIGURED:
+        return False, f"Error: {_configuration_problem()}"
 
     try:
         # Ensure output_filename is a full path if it's not already
@@ -111,21 +1701,888 @@ def text_to_speech_gui(text_input: str, output_filename: str, model: str, voice:
         return False, f"Error creating speech file path: {e}"
 
     try:
-        with client.audio.speech.with_streaming_response.create(
-            model=model,
-            voice=voice,
-            input=text_input,
-            speed=speed,
-            response_format="mp3"
-        ) as response:
-            response.stream_to_file(speech_file_path)
+        if on_pcm:
+            speech_file_path = speech_file_path.with_suffix(".wav")
+            blocks = iter_speech(text_input, model=model, voice=voice, speed=speed, response_format="pcm", use_cache=True,
+                                 cancel=cancel, on_progress=on_progress, stream_first_chunk=True)
+
+            def played(block):
+                on_pcm(block)
+                return block
+
+            _write_pcm_as_wav(map(played, blocks), speech_file_path)
+        else:
+            synthesize_document(text_input, speech_file_path, model=model, voice=voice, speed=speed, response_format="mp3",
+                                first_chunk_chars=FIRST_CHUNK_CHARS if on_chunk else None, on_chunk=on_chunk,
+                                cancel=cancel, on_progress=on_progress)
         return True, str(speech_file_path)
+    except ConversionCancelled:
+        return False, "Conversion cancelled."
     except Exception as e:
         return False, f"An error occurred while generating speech: {e}"
 
 
+# --- Async API ---
+async def _request_speech_async(client, text_input: str, model: str, voice: str, speed: float, response_format: str,
+                                timeout: float) -> bytes:
+    async with client.audio.speech.with_streaming_response.create(
+        model=model,
+        voice=voice,
+        input=text_input,
+        speed=speed,
+        response_format=response_format,
+        timeout=_request_timeout(timeout)
+    ) as response:
+        audio = bytearray()
+        async for data in response.iter_bytes():
+            audio += data
+        return bytes(audio)
+
+
+async def _limited_request_async(text_input: str, model: str, voice: str, speed: float, response_format: str,
+                                 timeout: float) -> bytes:
+    """The async counterpart of _limited_request, sharing its endpoints, limits and rate budgets."""
+    import asyncio
+    endpoint = await endpoint_pool.acquire_async()
+    start = None
+    outcome = "error"
+    try:
+        await endpoint.rate_limiter.acquire_async(len(text_input))
+        start = time.monotonic()
+        audio = await _request_speech_async(endpoint.get_async_client(), text_input, model, voice, speed, response_format,
+                                            timeout)
+        outcome = "ok"
+        hedge_policy.record(time.monotonic() - start, len(text_input))
+        return audio
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except Exception as e:
+        outcome = _request_outcome(e)
+        raise
+    finally:
+        endpoint_pool.release(endpoint, outcome, time.monotonic() - (start or time.monotonic()), len(text_input))
+
+
+async def _synthesize_chunk_async(text_input: str, model: str, voice: str, speed: float, response_format: str,
+                                  semaphore) -> bytes:
+    """Synthesizes one chunk within semaphore, retrying transient failures like call_with_retries."""
+    import asyncio
+    deadline = time.monotonic() + REQUEST_DEADLINE_SECONDS
+    attempt = 0
+    while True:
+        try:
+            async with semaphore:
+                return await _limited_request_async(text_input, model, voice, speed, response_format,
+                                                    max(0.001, deadline - time.monotonic()))
+        except Exception as e:
+            delay = _retry_delay(e, attempt, MAX_RETRIES, deadline)
+            if delay is None:
+                raise
+            attempt += 1
+            await asyncio.sleep(delay)  # Outside the semaphore, so waiting does not hold a slot
+
+
+async def _stream_chunk_async(text_input: str, model: str, voice: str, speed: float, response_format: str, semaphore):
+    """The async counterpart of _stream_chunk: yields one chunk's audio as it arrives, retrying only before the first block."""
+    import asyncio
+    deadline = time.monotonic() + REQUEST_DEADLINE_SECONDS
+    attempt = 0
+    received = 0
+    while True:
+        try:
+            async with semaphore:
+                endpoint = await endpoint_pool.acquire_async()
+                start = None
+                outcome = "cancelled"  # Unless set below; also covers the caller closing the iterator early
+                try:
+                    await endpoint.rate_limiter.acquire_async(len(text_input))
+                    start = time.monotonic()
+                    async with endpoint.get_async_client().audio.speech.with_streaming_response.create(
+                        model=model,
+                        voice=voice,
+                        input=text_input,
+                        speed=speed,
+                        response_format=response_format,
+                        timeout=_request_timeout(deadline - time.monotonic())
+                    ) as response:
+                        async for data in response.iter_bytes():
+                            received += len(data)
+                            yield data
+                    outcome = "ok"
+                    return
+                except Exception as e:
+                    outcome = _request_outcome(e)
+                    raise
+                finally:
+                    endpoint_pool.release(endpoint, outcome, time.monotonic() - (start or time.monotonic()),
+                                          len(text_input))
+        except Exception as e:
+            delay = None if received else _retry_delay(e, attempt, MAX_RETRIES, deadline)
+            if delay is None:
+                raise
+        attempt += 1
+        await asyncio.sleep(delay)  # Outside the semaphore, so waiting does not hold a slot
+
+
+async def aiter_speech(text_input: str, model: str = "tts-1", voice: str = "alloy", speed: float = 1.0,
+                       response_format: str = "mp3", max_concurrency: Optional[int] = None,
+                       first_chunk_chars: Optional[int] = FIRST_CHUNK_CHARS, semaphore=None,
+                       stream_first_chunk: bool = False):
+    """
+    Synthesizes text of any length, yielding the audio in order as it becomes available.
+
+    The asyncio counterpart of synthesize_document with on_chunk: all chunks are requested at once,
+    at most max_concurrency at a time, and each chunk's audio is yielded as soon as it and every chunk
+    before it are done. The first chunk is kept short so that the first audio arrives quickly, and with
+    stream_first_chunk its audio is yielded block by block as it comes off the network, as in iter_speech.
+    Closing the iterator early, or cancelling the task consuming it, cancels the outstanding requests.
+
+    Args:
+        text_input (str): The text to convert to speech.
+        model (str): The TTS model to use.
+        voice (str): The voice to use.
+        speed (float): The playback speed.
+        response_format (str): The audio format requested from the API.
+        max_concurrency (int, optional): The maximum number of requests in flight.
+                                         Defaults to the combined concurrency limit of all endpoints.
+        first_chunk_chars (int, optional): A smaller size for the first chunk, see split_text.
+        semaphore (asyncio.Semaphore, optional): Shared with other calls to bound their requests together;
+                                                 overrides max_concurrency.
+        stream_first_chunk (bool): Whether to yield the first chunk's audio as it arrives. A failure
+                                   after its first bytes cannot be retried and is raised instead.
+
+    Yields:
+        bytes: Consecutive pieces of the encoded audio, in reading order.
+
+    Raises:
+        ValueError: If the text is blank, or needs several chunks in a format that cannot be concatenated.
+    """
+    import asyncio
+    chunks = _split_for_synthesis(text_input, response_format, first_chunk_chars)
+    semaphore = semaphore or asyncio.Semaphore(max_concurrency or endpoint_pool.max_concurrency)
+
+    def submit(remaining: list) -> list:
+        return [asyncio.ensure_future(_synthesize_chunk_async(chunk, model, voice, speed, response_format, semaphore))
+                for chunk in remaining]
+
+    tasks = None if stream_first_chunk else submit(chunks)
+    first_blocks = _stream_chunk_async(chunks[0], model, voice, speed, response_format, semaphore) if stream_first_chunk else None
+    try:
+        if first_blocks is not None:
+            # The other chunks are requested once the first is under way, so they cannot take the slot it needs
+            async for block in first_blocks:
+                if tasks is None:
+                    tasks = submit(chunks[1:])
+                yield block
+            if tasks is None:
+                tasks = submit(chunks[1:])
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks or []:
+            task.cancel()
+        if first_blocks is not None:
+            await first_blocks.aclose()
+
+
+def _read_cached(cache_key: str, response_format: str) -> Optional[bytes]:
+    """Returns the cached audio for cache_key, or None on a miss."""
+    cached_path = synthesis_cache.get(cache_key, response_format)
+    if cached_path:
+        try:
+            return cached_path.read_bytes()
+        except OSError:
+            pass  # Evicted in the meantime
+    return None
+
+
+async def synthesize(text_input: str, model: str = "tts-1", voice: str = "alloy", speed: float = 1.0,
+                     response_format: str = "mp3", max_concurrency: Optional[int] = None, use_cache: bool = True,
+                     semaphore=None) -> bytes:
+    """
+    Synthesizes text of any length and returns the audio, without a thread per request.
+
+    The asyncio counterpart of synthesize_document, built on AsyncOpenAI. Requests go through the same
+    endpoints, adaptive concurrency limits and rate budgets as the threaded functions, and at most
+    max_concurrency of them are in flight at a time. Cancelling the calling task cancels them all.
+
+    Args:
+        text_input (str): The text to convert to speech.
+        model (str): The TTS model to use.
+        voice (str): The voice to use.
+        speed (float): The playback speed.
+        response_format (str): The audio format requested from the API.
+        max_concurrency (int, optional): The maximum number of requests in flight.
+                                         Defaults to the combined concurrency limit of all endpoints.
+        use_cache (bool): Whether to consult and fill synthesis_cache.
+        semaphore (asyncio.Semaphore, optional): Shared with other calls to bound their requests together;
+                                                 overrides max_concurrency.
+
+    Returns:
+        bytes: The encoded audio.
+
+    Raises:
+        ValueError: If the text is blank, or needs several chunks in a format that cannot be concatenated.
+    """
+    import asyncio
+    use_cache = use_cache and synthesis_cache.max_bytes > 0
+    cache_key = SynthesisCache.key(text_input, model, voice, speed, response_format) if use_cache else None
+    if cache_key:
+        cached = await asyncio.to_thread(_read_cached, cache_key, response_format)  # Keeps disk I/O off the loop
+        if cached is not None:
+            return cached
+    audio = b"".join([chunk async for chunk in aiter_speech(text_input, model, voice, speed, response_format,
+                                                            max_concurrency, first_chunk_chars=None,
+                                                            semaphore=semaphore)])
+    if cache_key:
+        try:
+            await asyncio.to_thread(synthesis_cache.put_bytes, cache_key, response_format, audio)
+        except OSError as e:
+            print(f"Warning: Could not store speech in the cache at {synthesis_cache.directory}: {e}", file=sys.stderr)
+    return audio
+
+
+async def synthesize_many(texts: list, model: str = "tts-1", voice: str = "alloy", speed: float = 1.0,
+                          response_format: str = "mp3", max_concurrency: Optional[int] = None, use_cache: bool = True,
+                          return_exceptions: bool = False) -> list:
+    """
+    Synthesizes several texts concurrently, sharing one bound on the requests in flight.
+
+    Args:
+        texts (list[str]): The texts to convert to speech.
+        model, voice, speed, response_format, use_cache: As for synthesize.
+        max_concurrency (int, optional): The maximum number of requests in flight across all texts.
+                                         Defaults to the combined concurrency limit of all endpoints.
+        return_exceptions (bool): Return the exception in place of the audio of a text that failed,
+                                  instead of cancelling the others and raising it.
+
+    Returns:
+        list: The audio of each text (bytes), in the order of texts.
+    """
+    import asyncio
+    semaphore = asyncio.Semaphore(max_concurrency or endpoint_pool.max_concurrency)
+    tasks = [asyncio.ensure_future(synthesize(text_input, model, voice, speed, response_format, use_cache=use_cache,
+                                              semaphore=semaphore))
+             for text_input in texts]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# --- PCM Streaming ---
+class PcmJitterBuffer:
+    """
+    A bounded queue of raw PCM audio between a download and the audio device.
+
+    The writer (a download thread) appends blocks as they arrive, waiting while max_seconds of audio
+    are buffered. The reader (the playback loop) takes whole frames. Reading only starts once
+    prefill_seconds are buffered, which absorbs variations in arrival time. When the buffer runs dry
+    before the stream has ended (an underrun), the underrun is counted and the buffer prefills again
+    before playback goes on. That gives one short pause instead of repeated stutters.
+    """
+
+    def __init__(self, prefill_seconds: float = PCM_PREFILL_SECONDS, max_seconds: float = PCM_BUFFER_SECONDS,
+                 sample_rate: int = PCM_SAMPLE_RATE, frame_bytes: int = 2):
+        self.bytes_per_second = sample_rate * frame_bytes
+        self.frame_bytes = frame_bytes
+        self.prefill_bytes = max(frame_bytes, int(prefill_seconds * self.bytes_per_second))
+        self.max_bytes = max(self.prefill_bytes, int(max_seconds * self.bytes_per_second))
+        self.buffering = True  # Waiting for prefill_bytes before (re)starting playback
+        self.underruns = 0
+        self._data = bytearray()
+        self._closed = False
+        self._abandoned = False
+        self._condition = threading.Condition()
+
+    def write(self, data: bytes, cancel: Optional[CancellationToken] = None):
+        """Appends data, waiting while the buffer is full. Does nothing once the reader has abandoned the buffer."""
+        with self._condition:
+            while len(self._data) >= self.max_bytes and not self._abandoned:
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                self._condition.wait(timeout=0.1)
+            if not self._abandoned:
+                self._data += data
+
+    def close(self):
+        """Marks the end of the stream, so that the rest is played without waiting for prefill."""
+        with self._condition:
+            self._closed = True
+
+    def abandon(self):
+        """Discards the buffered audio and any written later, releasing a waiting writer."""
+        with self._condition:
+            self._abandoned = True
+            self._data.clear()
+            self._condition.notify_all()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the stream has ended and every whole frame has been read."""
+        with self._condition:
+            return (self._closed or self._abandoned) and len(self._data) < self.frame_bytes
+
+    @property
+    def buffered_seconds(self) -> float:
+        with self._condition:
+            return len(self._data) / self.bytes_per_second
+
+    def read(self, max_seconds: float, min_seconds: float = 0.05) -> bytes:
+        """
+        Returns up to max_seconds of whole frames, or b"" while prefilling.
+
+        Finding less than min_seconds buffered before the end of the stream counts as an underrun.
+        """
+        with self._condition:
+            available = len(self._data) - len(self._data) % self.frame_bytes
+            if not self._closed:
+                if self.buffering and available < self.prefill_bytes:
+                    return b""
+                if not self.buffering and available < min_seconds * self.bytes_per_second:
+                    self.buffering = True
+                    self.underruns += 1
+                    return b""
+            self.buffering = False
+            size = min(available, int(max_seconds * self.bytes_per_second) // self.frame_bytes * self.frame_bytes)
+            data = bytes(self._data[:size])
+            del self._data[:size]
+            self._condition.notify_all()
+            return data
+
+
+def _write_pcm_as_wav(blocks, output_path: Path, sample_rate: int = PCM_SAMPLE_RATE):
+    """Writes raw 16-bit mono PCM blocks to output_path as a WAV file, through a partial file replaced at the end."""
+    import wave
+    partial_path = output_path.with_name(output_path.name + ".part")
+    try:
+        with wave.open(str(partial_path), "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            for block in blocks:
+                wav_file.writeframes(block)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
+    os.replace(partial_path, output_path)
+
+
+# --- Time Stretch ---
+# Speed can be changed locally on audio synthesized at 1.0x, so one cached synthesis serves every speed
+# and trying another speed costs no request.
+class TimeStretcher:
+    """
+    Changes the speed of mono audio by rate without changing its pitch, using a phase vocoder, block by block.
+
+    The audio is cut into overlapping frames taken rate times further apart than they are laid down
+    again. Each frame keeps its spectrum's magnitudes, and its phases advance by as much as the input's
+    did over one output hop, so every frequency continues smoothly from frame to frame. All frames of
+    a block are transformed at once with NumPy.
+
+    process() takes the samples in pieces of any size and returns the stretched samples it can finish
+    so far; flush() returns the rest once the input has ended. Only about two frames of input and
+    three hops of output are kept in between, so audio of any length is stretched in little memory.
+    """
+
+    def __init__(self, rate: float, frame_size: int = 1024):
+        """
+        Args:
+            rate (float): The speed factor; 2.0 plays twice as fast, 0.5 half as fast.
+            frame_size (int): Samples per analysis frame; 1024 is about 40 ms of speech at 24 kHz.
+        """
+        import numpy as np
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, not {rate}")
+        self.rate = rate
+        self.frame_size = frame_size
+        self.hop = frame_size // 4
+        self._window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_size) / frame_size)
+        # The input as seen by the frames: _padding zeros, then the samples; _input holds its tail from _input_start on
+        self._padding = frame_size // 2
+        self._input = np.zeros(self._padding)
+        self._input_start = 0
+        self._input_length = 0  # Samples passed to process()
+        self._next_frame = 0
+        self._phase = None
+        # Four windowed frames overlap every output hop; these are the sums still waiting for later frames
+        self._overlap = np.zeros((3, self.hop))
+        self._skip = self._padding  # Output that belongs to the leading zeros
+        self._output_length = 0  # Samples returned so far
+
+    @property
+    def passthrough(self) -> bool:
+        return abs(self.rate - 1.0) < 1e-3
+
+    def _position(self, frame: int) -> int:
+        return int(round(frame * self.hop * self.rate))
+
+    def process(self, samples):
+        """Adds samples and returns the stretched samples that are complete, as float64."""
+        import numpy as np
+        samples = np.asarray(samples, dtype=np.float64)
+        self._input_length += len(samples)
+        if self.passthrough:
+            self._output_length += len(samples)
+            return samples.copy()
+        self._input = np.concatenate([self._input, samples])
+        return self._stretch_available()
+
+    def flush(self):
+        """Returns the remaining stretched samples, so that len(samples) / rate were returned in all."""
+        import numpy as np
+        total = int(round(self._input_length / self.rate)) if not self.passthrough else self._input_length
+        if self.passthrough or self._output_length >= total:
+            return np.zeros(0)
+        # Pad with silence until the frames reach the end of the output, then cut the output there
+        frames_needed = -(-(self._padding + total) // self.hop)
+        input_end = self._position(frames_needed - 1) + self.hop + self.frame_size
+        silence = input_end - (self._input_start + len(self._input))
+        if silence > 0:
+            self._input = np.concatenate([self._input, np.zeros(silence)])
+        already = self._output_length
+        stretched = self._stretch_available()[:total - already]
+        self._output_length = total
+        return stretched
+
+    def _stretch_available(self):
+        import numpy as np
+        input_end = self._input_start + len(self._input)
+        last = self._next_frame
+        while self._position(last) + self.hop + self.frame_size <= input_end:
+            last += 1
+        pieces = []
+        offsets = np.arange(self.frame_size)
+        for first in range(self._next_frame, last, 256):
+            frame_numbers = np.arange(first, min(first + 256, last))
+            positions = np.round(frame_numbers * self.hop * self.rate).astype(np.int64) - self._input_start
+            indices = positions[:, None] + offsets
+            spectrum = np.fft.rfft(self._input[indices] * self._window, axis=1)
+            advance = np.angle(np.fft.rfft(self._input[indices + self.hop] * self._window, axis=1)) - np.angle(spectrum)
+            if self._phase is None:
+                self._phase = np.angle(spectrum[0])
+            phases = self._phase + np.cumsum(np.vstack([np.zeros_like(advance[:1]), advance[:-1]]), axis=0)
+            self._phase = np.mod(phases[-1] + advance[-1], 2 * np.pi)
+            frames = np.fft.irfft(np.abs(spectrum) * np.exp(1j * phases), n=self.frame_size, axis=1) * self._window
+            frames = frames.reshape(len(frames), 4, self.hop) / 1.5  # The squared Hann windows add up to 1.5
+            output = np.zeros((len(frames) + 3, self.hop))
+            output[:3] += self._overlap
+            for quarter in range(4):
+                output[quarter:quarter + len(frames)] += frames[:, quarter]
+            self._overlap = output[len(frames):]
+            pieces.append(output[:len(frames)].reshape(-1))
+        self._next_frame = last
+        # Input before the next frame is not needed any more
+        drop = min(len(self._input), self._position(last) - self._input_start)
+        self._input = self._input[drop:]
+        self._input_start += drop
+        stretched = np.concatenate(pieces) if pieces else np.zeros(0)
+        skipped = min(self._skip, len(stretched))
+        self._skip -= skipped
+        stretched = stretched[skipped:]
+        self._output_length += len(stretched)
+        return stretched
+
+
+def time_stretch(samples, rate: float, frame_size: int = 1024):
+    """
+    Changes the speed of mono audio by rate without changing its pitch; see TimeStretcher.
+
+    Returns:
+        numpy.ndarray: About len(samples) / rate samples, with the dtype of samples; integers are clipped to its range.
+    """
+    import numpy as np
+    samples = np.asarray(samples)
+    stretcher = TimeStretcher(rate, frame_size)
+    stretched = np.concatenate([stretcher.process(samples), stretcher.flush()])
+    if np.issubdtype(samples.dtype, np.integer):
+        limits = np.iinfo(samples.dtype)
+        return np.clip(np.round(stretched), limits.min, limits.max).astype(samples.dtype)
+    return stretched.astype(samples.dtype)
+
+
+def stretch_pcm(pcm: bytes, rate: float) -> bytes:
+    """Time-stretches raw 16-bit mono PCM, such as the API's pcm format, by rate; see time_stretch."""
+    import numpy as np
+    samples = np.frombuffer(pcm, dtype="<i2", count=len(pcm) // 2)
+    return time_stretch(samples, rate).astype("<i2").tobytes()
+
+
+def iter_stretched_pcm(blocks, rate: float):
+    """
+    Time-stretches a stream of raw 16-bit mono PCM blocks by rate, yielding the stretched PCM as it is ready.
+
+    Blocks may be of any size, including an odd number of bytes, as they come off the network.
+    """
+    import numpy as np
+    stretcher = TimeStretcher(rate)
+    remainder = b""
+
+    def to_pcm(samples) -> bytes:
+        return np.clip(np.round(samples), -32768, 32767).astype("<i2").tobytes()
+
+    for block in blocks:
+        data = remainder + block
+        usable = len(data) - len(data) % 2
+        remainder = data[usable:]
+        stretched = stretcher.process(np.frombuffer(data, dtype="<i2", count=usable // 2))
+        if len(stretched):
+            yield to_pcm(stretched)
+    stretched = stretcher.flush()
+    if len(stretched):
+        yield to_pcm(stretched)
+
+
+# --- Playback ---
+_mixer_lock = threading.Lock()
+_end_event = None  # pygame event type posted when playback ends; see _enable_end_events()
+
+
+def _init_mixer():
+    """Imports pygame and initializes the mixer on first playback. Raises pygame.error if there is no audio device."""
+    global pygame
+    with _mixer_lock:
+        if pygame is None:
+            import pygame as pygame_module
+            pygame = pygame_module
+        if not pygame.mixer.get_init():
+            # The API's own sample format, so raw PCM can be played as received; SDL converts for the device
+            pygame.mixer.init(frequency=PCM_SAMPLE_RATE, size=-16, channels=1, allowedchanges=0)
+
+
+def _enable_end_events() -> Optional[int]:
+    """
+    Has pygame post an event whenever music ends and returns that event's type, which channels are
+    given with set_endevent() to do the same. Returns None if pygame has no event queue here.
+
+    The event queue belongs to SDL's video subsystem. Tk owns the windows, so SDL's dummy video
+    driver is used unless another one is configured, and no other events are let into the queue.
+    """
+    global _end_event
+    with _mixer_lock:
+        if _end_event is None:
+            try:
+                if not pygame.display.get_init():
+                    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+                    pygame.display.init()
+            except pygame.error:
+                return None
+            _end_event = pygame.event.custom_type()
+            pygame.event.set_blocked(None)
+            pygame.event.set_allowed(_end_event)
+            pygame.mixer.music.set_endevent(_end_event)
+        return _end_event
+
+
+def _mixer_busy() -> bool:
+    return (pygame is not None and bool(pygame.mixer.get_init())
+            and (pygame.mixer.get_busy() or pygame.mixer.music.get_busy()))
+
+
+def _pause_mixer():
+    pygame.mixer.pause()
+    pygame.mixer.music.pause()
+
+
+def _unpause_mixer():
+    pygame.mixer.unpause()
+    pygame.mixer.music.unpause()
+
+
+def _stop_mixer():
+    """Stops all channels and the music stream, and closes the streamed file so that it can be rewritten."""
+    pygame.mixer.stop()
+    pygame.mixer.music.stop()
+    pygame.mixer.music.unload()
+
+
+_MP3_BITRATES = {  # kbit/s by bitrate index, Layer III
+    "1": (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    "2": (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mp3_duration(path) -> Optional[float]:
+    """Returns the duration of an MP3 file by walking its frame headers, without decoding; None if it has none."""
+    import mmap
+    with open(path, "rb") as mp3_file:
+        if os.fstat(mp3_file.fileno()).st_size < 4:
+            return None
+        with mmap.mmap(mp3_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position, end, samples, sample_rate = 0, len(data) - 4, 0, None
+            while position <= end:
+                if data[position:position + 3] == b"ID3" and position + 10 <= len(data):
+                    size = data[position + 6] << 21 | data[position + 7] << 14 | data[position + 8] << 7 | data[position + 9]
+                    position += 10 + size
+                    continue
+                header = int.from_bytes(data[position:position + 4], "big")
+                version, layer = header >> 19 & 3, header >> 17 & 3
+                bitrate_index, rate_index = header >> 12 & 15, header >> 10 & 3
+                if (header >> 21 != 0x7FF or version == 1 or layer != 1
+                        or bitrate_index in (0, 15) or rate_index == 3):
+                    position += 1  # Not a Layer III frame header; resynchronize
+                    continue
+                sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+                bitrate = _MP3_BITRATES["1" if version == 3 else "2"][bitrate_index] * 1000
+                frame_samples = 1152 if version == 3 else 576
+                position += frame_samples // 8 * bitrate // sample_rate + (header >> 9 & 1)
+                samples += frame_samples
+    return samples / sample_rate if sample_rate else None
+
+
+def _audio_duration(path) -> Optional[float]:
+    """Returns the duration in seconds of a WAV or MP3 file without decoding it, or None if unknown."""
+    suffix = Path(path).suffix.lower()
+    try:
+        if suffix == ".wav":
+            import wave
+            with wave.open(str(path)) as wav_file:
+                return wav_file.getnframes() / wav_file.getframerate()
+        if suffix == ".mp3":
+            return _mp3_duration(path)
+    except (OSError, EOFError, ValueError):
+        pass
+    return None
+
+
+def _wav_header(data_size: int, channels: int, width: int, rate: int) -> bytes:
+    """Returns the 44-byte header of a PCM WAV file holding data_size bytes of samples."""
+    import struct
+    frame_bytes = channels * width
+    return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_size, b"WAVE", b"fmt ", 16, 1, channels,
+                       rate, rate * frame_bytes, frame_bytes, width * 8, b"data", data_size)
+
+
+class _WavTail(io.RawIOBase):
+    """
+    Reads as a WAV file holding the audio of another WAV file from a given number of seconds on.
+
+    pygame.mixer.music cannot seek in WAV files, so to start one part-way through it is given this
+    view instead. The samples are read from disk as the mixer needs them; nothing is copied up front.
+    """
+
+    def __init__(self, path, seconds: float):
+        import struct
+        import wave
+        with wave.open(str(path)) as wav_file:
+            channels, width, rate = wav_file.getnchannels(), wav_file.getsampwidth(), wav_file.getframerate()
+            frames = wav_file.getnframes()
+        frame_bytes = channels * width
+        skipped = min(frames, max(0, int(seconds * rate))) * frame_bytes
+        data_size = frames * frame_bytes - skipped
+        self._file = open(path, "rb")
+        self._file.seek(12)
+        while True:  # Find the data chunk after the RIFF header
+            chunk_header = self._file.read(8)
+            if len(chunk_header) < 8:
+                self._file.close()
+                raise EOFError(f"{path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+            if chunk_id == b"data":
+                break
+            self._file.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+        self._data_start = self._file.tell() + skipped
+        self._header = _wav_header(data_size, channels, width, rate)
+        self._size = len(self._header) + data_size
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        end = min(len(view), self._size - self._position)
+        count = 0
+        if self._position < len(self._header):
+            count = min(end, len(self._header) - self._position)
+            view[:count] = self._header[self._position:self._position + count]
+        if count < end:
+            self._file.seek(self._data_start + self._position + count - len(self._header))
+            count += self._file.readinto(view[count:end])
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._position, os.SEEK_END: self._size}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _format_clock(seconds: float) -> str:
+    """Formats a playback position as "m:ss", or "h:mm:ss" from an hour on."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def _play_music_from(path, seconds: float):
+    """Starts pygame.mixer.music playing path from seconds on, loading it again only where it cannot seek."""
+    if Path(path).suffix.lower() == ".wav":
+        pygame.mixer.music.load(_WavTail(path, seconds), "wav")
+        pygame.mixer.music.play()
+    else:
+        pygame.mixer.music.play(start=seconds)
+
+
+class PlaybackQueue:
+    """
+    Plays a sequence of clips back to back on one mixer channel, without gaps between them.
+
+    add() hands a clip to a background thread for decoding and returns at once, so the next clip is
+    usually decoded long before the current one ends. pump() must then be called every few tens of
+    milliseconds, from the Tk event loop or through wait(). It keeps the next decoded clip in the
+    channel's queue, and the mixer starts that clip the moment the current one ends.
+    """
+
+    def __init__(self, on_clip_started: Optional[Callable[[object], None]] = None):
+        """
+        Args:
+            on_clip_started (callable, optional): Called from pump() with a clip's label when it starts playing.
+
+        Raises:
+            pygame.error: If there is no audio device.
+        """
+        _init_mixer()
+        self.on_clip_started = on_clip_started
+        self.paused = False
+        self._pending = deque()  # (label, future of the decoded Sound) in play order
+        self._queued_label = None
+        self._has_queued = False  # Whether a clip waits in the channel's queue
+        self._channel = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._decoder = ThreadPoolExecutor(max_workers=1)
+
+    def add(self, clip, label=None):
+        """Adds a clip, given as a file path, encoded audio bytes or a pygame Sound. Ignored after close or stop."""
+        with self._lock:
+            if not self._closed:
+                self._pending.append((label, self._decoder.submit(self._decode, clip)))
+
+    @staticmethod
+    def _decode(clip):
+        if isinstance(clip, (bytes, bytearray)):
+            return pygame.mixer.Sound(file=io.BytesIO(clip))
+        if isinstance(clip, (str, Path)):
+            return pygame.mixer.Sound(str(clip))
+        return clip
+
+    def close(self):
+        """Marks the end of the sequence; pump() reports it finished once the clips added so far have played."""
+        with self._lock:
+            self._closed = True
+        self._decoder.shutdown(wait=False)
+
+    def pump(self) -> bool:
+        """Moves the next decoded clip into the channel's queue. Returns False once the sequence has finished."""
+        started = []
+        with self._lock:
+            if self.paused:
+                return True
+            channel = self._channel
+            if self._has_queued and channel.get_queue() is None:
+                # The mixer has moved the queued clip into playback
+                self._has_queued = False
+                started.append(self._queued_label)
+            busy = channel is not None and channel.get_busy()
+            if not (busy and self._has_queued) and self._pending and self._pending[0][1].done():
+                label, future = self._pending.popleft()
+                try:
+                    sound = future.result()
+                except (pygame.error, OSError) as e:
+                    print(f"Could not decode clip {label}: {e}")
+                else:
+                    if busy:
+                        channel.queue(sound)
+                        self._queued_label = label
+                        self._has_queued = True
+                    else:
+                        if channel is None:
+                            channel = self._channel = pygame.mixer.find_channel(True)
+                        channel.play(sound)
+                        started.append(label)
+            finished = (self._closed and not self._pending and not self._has_queued
+                        and not (channel is not None and channel.get_busy()))
+        if self.on_clip_started:
+            for label in started:
+                self.on_clip_started(label)
+        return not finished
+
+    def pause(self):
+        with self._lock:
+            self.paused = True
+            if self._channel is not None:
+                self._channel.pause()
+
+    def resume(self):
+        with self._lock:
+            self.paused = False
+            if self._channel is not None:
+                self._channel.unpause()
+
+    def stop(self):
+        """Stops playback and drops the clips not yet played."""
+        with self._lock:
+            self._closed = True
+            for _, future in self._pending:
+                future.cancel()
+            self._pending.clear()
+            self._has_queued = False
+            if self._channel is not None:
+                self._channel.stop()
+        self._decoder.shutdown(wait=False)
+
+    def wait(self, interval: float = 0.02):
+        """Pumps until the sequence has finished; for scripts without an event loop. Call close() first."""
+        while self.pump():
+            time.sleep(interval)
+
+
+# --- GUI ---
+def _set_dpi_awareness():
+    if platform.system() == "Windows":
+        import ctypes
+        try:
+            # Try for Per-Monitor DPI Awareness V2
+            ctypes.windll.shcore.SetProcessDpiAwareness(2)
+        except (AttributeError, OSError):
+            try:
+                # Try for Per-Monitor DPI Awareness V1
+                ctypes.windll.shcore.SetProcessDpiAwareness(1)
+            except (AttributeError, OSError):
+                try:
+                    # Try for System DPI Awareness
+                    ctypes.windll.user32.SetProcessDPIAware()
+                except (AttributeError, OSError):
+                    print("Warning: Could not set DPI awareness. GUI might appear blurry on high-DPI displays.")
+
+
+def _load_gui_modules():
+    """Imports tkinter into the module namespace, once."""
+    global tk, ttk, filedialog, messagebox
+    if tk is not None:
+        return
+    import tkinter
+    from tkinter import ttk as tkinter_ttk, filedialog as tkinter_filedialog, messagebox as tkinter_messagebox
+    tk, ttk, filedialog, messagebox = tkinter, tkinter_ttk, tkinter_filedialog, tkinter_messagebox
+
+
 class TTSApp:
     def __init__(self, root):
+        _load_gui_modules()
         self.root = root
         self.root.title("OpenAI Text-to-Speech Tool")
         self.root.geometry("800x700")  # Increased window size for better visibility
@@ -135,22 +2592,51 @@ class TTSApp:
         self.models = ["tts-1", "tts-1-hd"]
         self.playback_state = "stopped"  # Can be "playing", "paused", "stopped"
         self.sound_object = None
+        self.source_sound = None  # current_filepath decoded, at the speed it was converted at
+        self.sound_rate = None  # Speed factor applied locally to source_sound to make sound_object
+        self.current_speed = 1.0  # Speed current_filepath was converted at
+        self.speed_timer = None  # Tk timer that applies a moved speed slider to the playing file
+        self.stretch_pending = None  # Speed factor source_sound is being stretched to on a worker thread
+        self.music_loaded = False  # True while current_filepath is streamed by pygame.mixer.music instead
         self.playback_start_time = 0
         self.paused_elapsed_time = 0  # To store elapsed time when paused
+        self.playback_offset = 0.0  # Where in the file the current play() started, in seconds
+        self.playback_duration = 0.0
+        self.sound_channel = None  # Mixer channel playing sound_object
+        self.seek_dragging = False  # True while the progress bar is held down to seek
+        self.playback_timer = None  # Tk timer of _playback_tick while a file plays
+        self.streaming = False  # True while chunks of an ongoing conversion are being played
+        self.playback_queue = None  # PlaybackQueue of the chunks of an ongoing conversion
+        self.stream_channel = None  # Mixer channel of the low-latency stream
+        self.pcm_buffer = None  # PcmJitterBuffer between the download and the mixer in low-latency mode
+        self.conversion_done = True
+        self.conversion_start_time = 0
+        self.conversion_cancel = None  # CancellationToken of the ongoing conversion
+        self.conversion_status = ""  # Status text of the ongoing conversion, followed by its download progress
 
         self._create_widgets()
         self._check_api_key()
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)  # Handle cleanup
+        if API_CONFIGURED:
+            self._keep_connection_warm()
 
     def _on_closing(self):
-        if pygame.mixer.get_busy():
-            pygame.mixer.stop()
-        pygame.mixer.quit()
+        if _mixer_busy():
+            _stop_mixer()
+        if pygame is not None:
+            pygame.mixer.quit()
         self.root.destroy()
 
+    def _keep_connection_warm(self):
+        """Connects to the API in the background now and again whenever the app sits idle, so conversions start warm."""
+        if self.conversion_done:
+            threading.Thread(target=warm_up_connection, daemon=True).start()
+        if KEEP_WARM_SECONDS > 0:
+            self.root.after(int(KEEP_WARM_SECONDS * 1000), self._keep_connection_warm)
+
     def _check_api_key(self):
-        if not OPENAI_API_KEY:
-            self.status_var.set("Critical Error: Valid OPENAI_API_KEY is not configured in the .env file.")
+        if not API_CONFIGURED:
+            self.status_var.set(f"Critical Error: {_configuration_problem()}")
             self.convert_button.config(state=tk.DISABLED)
 
     def _create_widgets(self):
@@ -180,6 +2666,14 @@ class TTSApp:
         self.speed_label_var = tk.StringVar(value="1.00x")
         ttk.Label(controls_frame, textvariable=self.speed_label_var).grid(row=1, column=3, padx=5, pady=5, sticky=tk.W)
 
+        self.play_while_converting_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(controls_frame, text="Play while converting", variable=self.play_while_converting_var,
+                        command=self._update_low_latency_state).grid(row=2, column=0, columnspan=2, padx=5, pady=5, sticky=tk.W)
+        self.low_latency_var = tk.BooleanVar(value=False)
+        self.low_latency_check = ttk.Checkbutton(controls_frame, text="Low latency (raw PCM, saved as WAV)", variable=self.low_latency_var)
+        self.low_latency_check.grid(row=2, column=2, columnspan=2, padx=5, pady=5, sticky=tk.W)
+        self._update_low_latency_state()
+
         # --- Text Input Frame ---
         text_frame = ttk.LabelFrame(main_frame, text="Input Text", padding="10")
         text_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 5))
@@ -191,7 +2685,7 @@ class TTSApp:
         self.text_input.bind("<KeyRelease>", self._update_char_count)
 
         # --- Character Count Label ---
-        self.char_count_var = tk.StringVar(value="Characters: 0 / 4096")
+        self.char_count_var = tk.StringVar(value="Characters: 0")
         self.char_count_label = ttk.Label(main_frame, textvariable=self.char_count_var)
         self.char_count_label.pack(fill=tk.X, padx=10, pady=(0, 10))
 
@@ -224,28 +2718,105 @@ class TTSApp:
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(output_actions_frame, variable=self.progress_var, orient=tk.HORIZONTAL, length=200, mode='determinate')
         self.progress_bar.grid(row=2, column=0, columnspan=3, padx=5, pady=(10, 5), sticky=tk.EW)
+        # Clicking or dragging on the bar seeks in the audio being played
+        self.progress_bar.bind("<Button-1>", self._on_progress_drag)
+        self.progress_bar.bind("<B1-Motion>", self._on_progress_drag)
+        self.progress_bar.bind("<ButtonRelease-1>", self._on_progress_release)
 
         # --- Status Bar ---
         self.status_var = tk.StringVar(value="Ready. Inspired by naturalreaders.com/online/")
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W, padding="2")
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
+    def _update_low_latency_state(self):
+        """Enables the low latency option only while playing during conversion, which is the only time it applies."""
+        if self.play_while_converting_var.get():
+            self.low_latency_check.config(state=tk.NORMAL)
+        else:
+            self.low_latency_var.set(False)
+            self.low_latency_check.config(state=tk.DISABLED)
+
     def _update_speed_label(self, value):
         self.speed_label_var.set(f"{float(value):.2f}x")
+        # Applied once the slider rests, since each new speed means stretching the audio again
+        if self.speed_timer is not None:
+            self.root.after_cancel(self.speed_timer)
+        self.speed_timer = self.root.after(300, self._apply_playback_speed)
+
+    def _playback_rate(self) -> float:
+        """Returns the speed factor to apply locally, so current_filepath plays at the speed on the slider."""
+        return round(self.speed_var.get(), 2) / self.current_speed
+
+    def _apply_playback_speed(self):
+        """Brings the decoded file up to the slider's speed, once the slider rests."""
+        self.speed_timer = None
+        if self.source_sound and not self.music_loaded and not self.streaming:
+            self._request_stretch()
+
+    def _request_stretch(self):
+        """
+        Stretches source_sound to the slider's speed on a worker thread, unless sound_object already plays at it.
+
+        Stretching takes about a second per five minutes of audio, which would freeze the window; in
+        the meantime the current speed keeps playing, and _use_stretched swaps the result in.
+        """
+        rate = self._playback_rate()
+        if rate == self.sound_rate or rate == self.stretch_pending:
+            return
+        source = self.source_sound
+        if abs(rate - 1.0) < 1e-3:
+            self._use_stretched(source, rate, None)
+            return
+        self.stretch_pending = rate
+        if self.playback_state != "stopped":
+            self.status_var.set(f"Changing speed to {round(self.speed_var.get(), 2):.2f}x...")
+        samples = source.get_raw()
+
+        def stretch():
+            pcm = stretch_pcm(samples, rate)
+            self.root.after(0, self._use_stretched, source, rate, pcm)
+
+        threading.Thread(target=stretch, daemon=True).start()
+
+    def _use_stretched(self, source, rate: float, pcm: Optional[bytes]):
+        """Plays source stretched to rate (pcm, or source itself for None) from the same point in the text on."""
+        if rate == self.stretch_pending:
+            self.stretch_pending = None
+        if source is not self.source_sound:
+            return  # Another file has been converted since
+        if rate != self._playback_rate():
+            self._request_stretch()  # The slider moved on while this was being stretched
+            return
+        paused = self.playback_state == "paused"
+        playing = self.playback_state != "stopped" and not self.streaming and not self.music_loaded
+        fraction = self._playback_position() / self.playback_duration if playing and self.playback_duration else 0.0
+        try:
+            self.sound_object = source if pcm is None else pygame.mixer.Sound(buffer=pcm)
+            self.sound_rate = rate
+            if not playing:
+                return
+            self.playback_duration = self.sound_object.get_length()
+            self.progress_bar.config(maximum=self.playback_duration)
+            self._play_from(min(fraction, 1.0) * self.playback_duration)
+        except pygame.error as e:
+            self.status_var.set(f"Could not change speed: {e}")
+            return
+        if paused:
+            _pause_mixer()
+        self.status_var.set(f"{'Paused' if paused else 'Playing'} at {round(self.speed_var.get(), 2):.2f}x: "
+                            f"{Path(self.current_filepath).name}")
 
     def _update_char_count(self, event=None):
-        char_count = len(self.text_input.get("1.0", tk.END).rstrip('\n'))
-        self.char_count_var.set(f"Characters: {char_count} / 4096")
-        if char_count > 4096:
-            self.char_count_label.config(foreground="red")
-            self.status_var.set("Warning: Character count exceeds 4096 limit!")
+        text = self.text_input.get("1.0", tk.END).rstrip('\n')
+        char_count = len(text)
+        if char_count > MAX_INPUT_CHARS:
+            # Long text is converted in several requests; show how many so the cost is visible
+            self.char_count_var.set(f"Characters: {char_count} ({len(split_text(text))} requests of up to {MAX_INPUT_CHARS})")
         else:
-            self.char_count_label.config(foreground="")
-            if not self.convert_button["text"] == "Converting...":
-                if self.convert_button['state'] == tk.DISABLED and not self.status_var.get().startswith("Converting"):
-                    self.convert_button.config(state=tk.NORMAL)
-            if self.status_var.get().startswith("Warning: Character count"):
-                self.status_var.set("Ready.")
+            self.char_count_var.set(f"Characters: {char_count}")
+        if self.convert_button["text"] == "Convert to Speech":
+            if self.convert_button['state'] == tk.DISABLED and not self.status_var.get().startswith("Converting"):
+                self.convert_button.config(state=tk.NORMAL)
         return char_count
 
     def _browse_output_file(self):
@@ -262,12 +2833,7 @@ class TTSApp:
         text = self.text_input.get("1.0", tk.END).strip()
         char_count = len(text)
 
-        if char_count > 4096:
-            messagebox.showerror("Character Limit Exceeded", f"The input text ({char_count} characters) exceeds the 4096 character limit for OpenAI TTS.")
-            self.status_var.set(f"Error: Text too long ({char_count}/4096). Conversion cancelled.")
-            self.char_count_label.config(foreground="red")
-            return
-        elif char_count == 0 and not text:
+        if char_count == 0 and not text:
             messagebox.showwarning("Input Required", "Please enter some text to convert.")
             return
 
@@ -280,21 +2846,93 @@ class TTSApp:
 
         model = self.model_var.get()
         voice = self.voice_var.get()
-        speed = self.speed_var.get()
-
-        self.status_var.set(f"Converting using {model}, {voice}, {speed:.2f}x speed...")
-        self.convert_button.config(state=tk.DISABLED)
+        speed = round(self.speed_var.get(), 2)  # As shown on the speed label, so repeated requests hit the cache
+        stream = self.play_while_converting_var.get()
+        low_latency = stream and self.low_latency_var.get()
+
+        if stream:
+            self._stop_audio()
+            self.current_filepath = None  # The output file is being rewritten; only the stream is playable
+            self.streaming = True
+        elif self.music_loaded:
+            self._stop_audio()  # The streamed file is held open, which would keep it from being replaced on Windows
+        self.conversion_done = False
+        self.conversion_start_time = time.perf_counter()
+        self.conversion_cancel = CancellationToken()
+
+        chunk_count = len(split_text(text))
+        requests_note = f" in {chunk_count} requests" if chunk_count > 1 else ""
+        self.conversion_status = f"Converting using {model}, {voice}, {speed:.2f}x speed{requests_note}"
+        self.status_var.set(f"{self.conversion_status}...")
+        if not stream:
+            self.progress_bar.config(maximum=100, value=0)  # Shows the conversion until playback takes it over
+        self.convert_button.config(text="Cancel", command=self._cancel_conversion)
         self.play_pause_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.DISABLED)
 
-        thread = threading.Thread(target=self._perform_tts_conversion, args=(text, output_filename, model, voice, speed))
+        pcm_buffer = playback_queue = None
+        if low_latency:
+            pcm_buffer = self.pcm_buffer = PcmJitterBuffer()
+            self.root.after(20, self._feed_pcm)
+        elif stream:
+            try:
+                playback_queue = self.playback_queue = PlaybackQueue(on_clip_started=self._on_stream_clip_started)
+            except pygame.error as e:
+                self.streaming = False
+                messagebox.showwarning("Playback Unavailable", f"Could not open the audio device; converting without playing: {e}")
+            else:
+                self.root.after(50, self._feed_stream)
+
+        thread = threading.Thread(target=self._perform_tts_conversion,
+                                  args=(text, output_filename, model, voice, speed, self.conversion_cancel, pcm_buffer,
+                                        playback_queue))
         thread.daemon = True
         thread.start()
 
-    def _perform_tts_conversion(self, text, output_filename, model, voice, speed):
-        success, result = text_to_speech_gui(text, output_filename, model, voice, speed)
-        if success:
+    def _cancel_conversion(self):
+        if self.conversion_cancel is not None:
+            self.conversion_cancel.cancel()
+        self.convert_button.config(text="Cancelling...", state=tk.DISABLED)
+        self.status_var.set("Cancelling conversion...")
+
+    def _perform_tts_conversion(self, text, output_filename, model, voice, speed, cancel=None, pcm_buffer=None,
+                                playback_queue=None):
+        on_chunk = (lambda index, chunk_count, audio: playback_queue.add(audio, index)) if playback_queue else None
+        on_pcm = (lambda block: pcm_buffer.write(block, cancel)) if pcm_buffer else None
+
+        def on_progress(progress):
+            self.root.after(0, self._show_conversion_progress, cancel, progress)
+
+        try:
+            success, result = text_to_speech_gui(text, output_filename, model, voice, speed, on_chunk=on_chunk,
+                                                 cancel=cancel, on_progress=on_progress, on_pcm=on_pcm)
+        finally:
+            if pcm_buffer:
+                pcm_buffer.close()
+            if playback_queue:
+                playback_queue.close()
+        # Progress reports still queued on the Tk thread check these and are dropped
+        self.conversion_done = True
+        self.conversion_cancel = None
+        if not success and cancel is not None and cancel.cancelled:
+            if self.streaming:
+                self.root.after(0, self._stop_audio)
+            elif self.current_filepath:
+                # The previous audio file was left untouched, so it can still be played
+                self.play_pause_button.config(state=tk.NORMAL)
+                self.stop_button.config(state=tk.NORMAL)
+            self.status_var.set("Conversion cancelled.")
+            self.progress_bar.config(value=0)
+        elif success and self.streaming:
+            # The streamed chunks keep playing; the saved file is used for replays
+            self.current_filepath = result
+            self.current_speed = speed
+            self.sound_object = self.source_sound = None
+            self.status_var.set(f"Speech saved to: {self.current_filepath}. Still playing...")
+        elif success:
             self.current_filepath = result
+            self.current_speed = speed
+            self.source_sound = None
             self.status_var.set(f"Speech saved to: {self.current_filepath}")
             self.play_pause_button.config(state=tk.NORMAL, text="Play")
             self.stop_button.config(state=tk.NORMAL)
@@ -304,58 +2942,263 @@ class TTSApp:
                 self.sound_object = None
             self.char_count_label.config(foreground="")
         else:
+            if self.streaming:
+                self.root.after(0, self._stop_audio)
             self.current_filepath = None
             self.status_var.set(f"Error: {result}")
+            self.progress_bar.config(value=0)
             messagebox.showerror("Conversion Failed", result)
 
-        self.convert_button.config(state=tk.NORMAL)
+        self.convert_button.config(text="Convert to Speech", command=self._convert_tts_threaded, state=tk.NORMAL)
         self._update_char_count()
 
+    def _show_conversion_progress(self, cancel, progress):
+        if cancel is not self.conversion_cancel or cancel.cancelled:
+            return  # The conversion has finished or is being cancelled
+        self.status_var.set(f"{self.conversion_status}: {format_progress(progress)}")
+        if not self.streaming and progress["total_characters"]:
+            self.progress_bar.config(value=100 * progress["fraction_done"])
+
+    def _on_stream_clip_started(self, index):
+        if index == 0:
+            self._stream_started()
+
+    def _stream_started(self):
+        time_to_first_audio = time.perf_counter() - self.conversion_start_time
+        self.playback_state = "playing"
+        self.play_pause_button.config(state=tk.NORMAL, text="Pause")
+        self.stop_button.config(state=tk.NORMAL)
+        self.conversion_status = f"Playing while converting (first audio after {time_to_first_audio:.2f}s)"
+        self.status_var.set(f"{self.conversion_status}...")
+
+    def _feed_pcm(self):
+        """Moves audio from the jitter buffer to the mixer in short segments, keeping one queued behind the playing one."""
+        buffer = self.pcm_buffer
+        if not self.streaming or buffer is None:
+            return
+        if self.playback_state != "paused":
+            channel = self.stream_channel
+            if channel is None or channel.get_queue() is None:
+                underruns = buffer.underruns
+                segment = buffer.read(0.2)
+                if segment:
+                    try:
+                        _init_mixer()
+                        sound = pygame.mixer.Sound(buffer=segment)
+                    except pygame.error as e:
+                        self._stop_audio()
+                        self.status_var.set(f"Error playing audio: {e}")
+                        return
+                    if channel is not None and channel.get_busy():
+                        channel.queue(sound)
+                    else:
+                        # The first audio, or playback resuming after an underrun
+                        self.stream_channel = sound.play()
+                        if channel is None:
+                            self._stream_started()
+                        else:
+                            self.status_var.set(f"{self.conversion_status}...")
+                elif buffer.finished and (channel is None or not channel.get_busy()):
+                    self.streaming = False
+                    self.stream_channel = None
+                    self.pcm_buffer = None
+                    self._playback_finished_gui_update()
+                    return
+                elif buffer.underruns > underruns:
+                    self.status_var.set(f"Buffering: the download fell behind playback ({buffer.underruns}x)...")
+        self.root.after(20, self._feed_pcm)
+
+    def _feed_stream(self):
+        """Keeps the playback queue fed while chunks arrive, and notices when the last one has played."""
+        playback_queue = self.playback_queue
+        if not self.streaming or playback_queue is None:
+            return
+        if self.playback_state != "paused" and not playback_queue.pump():
+            self.streaming = False
+            self.playback_queue = None
+            self._playback_finished_gui_update()
+            return
+        self.root.after(50, self._feed_stream)
+
     def _toggle_play_pause(self):
-        if not self.current_filepath:
+        if not self.current_filepath and not self.streaming:
             messagebox.showerror("Error", "No audio file to play. Convert text first.")
             return
 
-        if self.playback_state == "stopped":
-            try:
-                if not self.sound_object:
-                    self.sound_object = pygame.mixer.Sound(self.current_filepath)
-
-                duration_sec = self.sound_object.get_length()
-                self.progress_bar.config(maximum=duration_sec, value=0)
-                self.paused_elapsed_time = 0  # Reset paused time
-
-                self.sound_object.play()
-                self.playback_start_time = time.time()  # Record start time
+        if self.streaming:
+            if self.playback_state == "playing":
+                _pause_mixer()
+                self.playback_state = "paused"
+                self.play_pause_button.config(text="Resume")
+                self.status_var.set("Paused while converting.")
+            else:
+                _unpause_mixer()
                 self.playback_state = "playing"
                 self.play_pause_button.config(text="Pause")
-                self.status_var.set(f"Playing: {Path(self.current_filepath).name}")
-                threading.Thread(target=self._monitor_playback, daemon=True).start()
-            except pygame.error as e:
-                messagebox.showerror("Playback Error", f"Could not play audio: {e}")
-                self.status_var.set(f"Error playing audio: {e}")
-                self.playback_state = "stopped"
-                self.play_pause_button.config(text="Play")
-                self.progress_bar.config(value=0)
+                self.status_var.set("Playing while converting...")
+            return
+
+        if self.playback_state == "stopped":
+            self._start_playback()
         elif self.playback_state == "playing":
-            pygame.mixer.pause()
+            _pause_mixer()
+            self._unwatch_playback()
             self.paused_elapsed_time = time.time() - self.playback_start_time + self.paused_elapsed_time
             self.playback_state = "paused"
             self.play_pause_button.config(text="Resume")
             self.status_var.set(f"Paused: {Path(self.current_filepath).name}")
         elif self.playback_state == "paused":
-            pygame.mixer.unpause()
+            _unpause_mixer()
             self.playback_start_time = time.time()
             self.playback_state = "playing"
             self.play_pause_button.config(text="Pause")
             self.status_var.set(f"Resumed: {Path(self.current_filepath).name}")
-            if not any(t.name == '_monitor_playback_thread' for t in threading.enumerate()):
-                threading.Thread(target=self._monitor_playback, name='_monitor_playback_thread', daemon=True).start()
+            self._watch_playback()
 
-    def _stop_audio(self):
-        if self.sound_object and pygame.mixer.get_busy():
-            pygame.mixer.stop()
+    def _start_playback(self, fraction: float = 0.0):
+        """Loads current_filepath and plays it from the given fraction of its length on."""
+        try:
+            _init_mixer()
+            _enable_end_events()
+            self.playback_duration = self._load_current_file()
+            self.progress_bar.config(maximum=self.playback_duration, value=0)
+            self._play_from(fraction * self.playback_duration)
+            self.playback_state = "playing"
+            self.play_pause_button.config(text="Pause")
+            if self.music_loaded and abs(self._playback_rate() - 1.0) >= 1e-3:
+                self.status_var.set(f"Playing at the converted speed, {self.current_speed:.2f}x; long files are not "
+                                    f"stretched locally: {Path(self.current_filepath).name}")
+            else:
+                self.status_var.set(f"Playing: {Path(self.current_filepath).name}")
+            self._watch_playback()
+        except (pygame.error, OSError, EOFError) as e:
+            messagebox.showerror("Playback Error", f"Could not play audio: {e}")
+            self.status_var.set(f"Error playing audio: {e}")
+            self.playback_state = "stopped"
+            self.play_pause_button.config(text="Play")
+            self.progress_bar.config(value=0)
+
+    def _play_from(self, seconds: float):
+        """
+        Plays the loaded file from seconds on, replacing whatever it is playing now.
+
+        Music seeks in the file it streams. A Sound cannot seek, so a new one is made from its already
+        decoded samples after that point and played on the same channel, which never falls silent in
+        between; either way nothing is decoded or synthesized again.
+        """
+        if self.music_loaded:
+            _play_music_from(self.current_filepath, seconds)
+        elif seconds > 0:
+            frequency, size, channels = pygame.mixer.get_init()
+            frame_bytes = abs(size) // 8 * channels
+            samples = self.sound_object.get_raw()
+            start = min(len(samples), int(seconds * frequency) * frame_bytes)
+            tail = pygame.mixer.Sound(buffer=samples[start:])
+            if self.sound_channel is not None and self.sound_channel.get_busy():
+                self.sound_channel.play(tail)
+            else:
+                self.sound_channel = tail.play()
+        elif self.sound_channel is not None and self.sound_channel.get_busy():
+            self.sound_channel.play(self.sound_object)
+        else:
+            self.sound_channel = self.sound_object.play()
+        if not self.music_loaded and self.sound_channel is not None and _end_event is not None:
+            self.sound_channel.set_endevent(_end_event)
+        self.playback_offset = seconds
+        self.playback_start_time = time.time()
+        self.paused_elapsed_time = 0
+
+    def _playback_position(self) -> float:
+        """
+        Returns how far into the loaded file playback is, in seconds.
+
+        Music reports how much of it the mixer has played. Sound channels do not, so for those the
+        time is counted while the channel plays, leaving pauses out.
+        """
+        if self.music_loaded:
+            return self.playback_offset + max(pygame.mixer.music.get_pos(), 0) / 1000
+        elapsed = self.paused_elapsed_time
+        if self.playback_state == "playing":
+            elapsed += time.time() - self.playback_start_time
+        return self.playback_offset + elapsed
+
+    def _seek_fraction(self, event) -> float:
+        """Returns where along the progress bar event happened, from 0 to 1."""
+        width = max(self.progress_bar.winfo_width(), 1)
+        return min(max(event.x / width, 0.0), 1.0)
+
+    def _on_progress_drag(self, event):
+        """Moves the progress bar under the pointer while it is clicked or dragged; the seek itself waits for release."""
+        if not self.current_filepath or self.streaming or not self.conversion_done:
+            return
+        self.seek_dragging = True
+        if self.playback_state != "stopped":
+            seconds = self._seek_fraction(event) * self.playback_duration
+            self.progress_var.set(seconds)
+            self.status_var.set(f"Seek to {_format_clock(seconds)} of {_format_clock(self.playback_duration)}")
+
+    def _on_progress_release(self, event):
+        """Seeks to where the progress bar was released, starting playback there if it was stopped."""
+        if not self.seek_dragging:
+            return
+        self.seek_dragging = False
+        fraction = self._seek_fraction(event)
+        if self.playback_state == "stopped":
+            self._start_playback(fraction)
+            return
+        seconds = fraction * self.playback_duration
+        paused = self.playback_state == "paused"
+        try:
+            self._play_from(seconds)
+        except (pygame.error, OSError, EOFError) as e:
+            self.status_var.set(f"Could not seek: {e}")
+            return
+        self.progress_var.set(seconds)
+        if paused:
+            _pause_mixer()
+            self.status_var.set(f"Paused at {_format_clock(seconds)}: {Path(self.current_filepath).name}")
+        else:
+            self.status_var.set(f"Playing from {_format_clock(seconds)}: {Path(self.current_filepath).name}")
+
+    def _load_current_file(self) -> float:
+        """
+        Prepares current_filepath for playback and returns its duration in seconds.
+
+        Files of MUSIC_STREAM_MIN_BYTES or more are streamed from disk by pygame.mixer.music; decoding
+        an audiobook-length file into a Sound would take seconds and hundreds of megabytes of memory.
+        For the same reason they play at the speed they were converted at. Other files are decoded once
+        and time-stretched to the speed slider in the background; see _request_stretch.
+        """
+        if os.path.getsize(self.current_filepath) >= MUSIC_STREAM_MIN_BYTES:
+            self.sound_object = None
+            pygame.mixer.music.load(self.current_filepath)
+            self.music_loaded = True
+            return _audio_duration(self.current_filepath) or 0.0
+        self.music_loaded = False
+        if not self.source_sound:
+            self.source_sound = pygame.mixer.Sound(self.current_filepath)
             self.sound_object = None
+        if not self.sound_object:
+            self.sound_object, self.sound_rate = self.source_sound, 1.0
+        # Moving the speed slider after converting stretches the audio instead of converting again
+        self._request_stretch()
+        return self.sound_object.get_length()
+
+    def _stop_audio(self):
+        self._unwatch_playback()
+        if (self.sound_object or self.streaming or self.music_loaded) and _mixer_busy():
+            _stop_mixer()
+        if self.music_loaded:
+            _stop_mixer()  # Also when paused, which music does not count as busy; this closes the file
+            self.music_loaded = False
+        self.streaming = False
+        if self.playback_queue is not None:
+            self.playback_queue.stop()  # The conversion goes on into the output file
+            self.playback_queue = None
+        self.stream_channel = None
+        if self.pcm_buffer is not None:
+            self.pcm_buffer.abandon()  # The download goes on into the WAV file
+            self.pcm_buffer = None
         self.playback_state = "stopped"
         self.play_pause_button.config(text="Play", state=tk.NORMAL if self.current_filepath else tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL if self.current_filepath else tk.DISABLED)
@@ -366,21 +3209,36 @@ class TTSApp:
         else:
             self.status_var.set("Playback stopped.")
 
-    def _monitor_playback(self):
-        """Monitors if the sound has finished playing and updates progress."""
-        while self.playback_state == "playing" and pygame.mixer.get_busy():
-            current_elapsed_sec = (time.time() - self.playback_start_time) + self.paused_elapsed_time
-
-            # Ensure value doesn't exceed maximum due to timing discrepancies
-            max_val = self.progress_bar['maximum']
-            current_elapsed_sec = min(current_elapsed_sec, max_val)
-
-            self.root.after(0, self.progress_var.set, current_elapsed_sec)
-            pygame.time.wait(50)  # Update roughly 20 times a second
-
-        # If it stopped playing (and wasn't manually stopped or paused before loop exit)
-        if self.playback_state == "playing" and not pygame.mixer.get_busy():
-            self.root.after(0, self._playback_finished_gui_update)
+    def _watch_playback(self):
+        """Starts the timer that follows playback of current_filepath, unless it is running already."""
+        if self.playback_timer is None:
+            if _end_event is not None:
+                pygame.event.clear(_end_event)  # Left over from earlier playback or streaming
+            self.playback_timer = self.root.after(100, self._playback_tick)
+
+    def _unwatch_playback(self):
+        if self.playback_timer is not None:
+            self.root.after_cancel(self.playback_timer)
+            self.playback_timer = None
+
+    def _playback_tick(self):
+        """
+        Moves the progress bar while current_filepath plays, and notices when it has ended.
+
+        The mixer posts an end event when music or the Sound's channel stops. Seeking restarts playback
+        and posts one too, so the mixer is asked whether it is idle before playback counts as finished.
+        Without an event queue that is asked on every tick instead.
+        """
+        self.playback_timer = None
+        if self.playback_state != "playing":
+            return
+        ended = pygame.event.get(_end_event) if _end_event is not None else True
+        if ended and not _mixer_busy():
+            self._playback_finished_gui_update()
+            return
+        if not self.seek_dragging:
+            self.progress_var.set(min(self._playback_position(), self.playback_duration))
+        self.playback_timer = self.root.after(100, self._playback_tick)
 
     def _playback_finished_gui_update(self):
         """Updates GUI when playback finishes naturally."""
@@ -397,11 +3255,13 @@ def main_gui():
     """
     Main function to launch the TTS GUI.
     """
-    if not OPENAI_API_KEY:
-        print("Critical Error: OPENAI_API_KEY is not configured in the .env file.")
+    _set_dpi_awareness()
+    _load_gui_modules()
+    if not API_CONFIGURED:
+        print(f"Critical Error: {_configuration_problem()}")
         root_check = tk.Tk()
         root_check.withdraw()
-        messagebox.showerror("API Key Error", "OPENAI_API_KEY is not configured correctly in the .env file. Please add it and restart.")
+        messagebox.showerror("Configuration Error", f"{_configuration_problem()} Please fix it and restart.")
         root_check.destroy()
         return
 
@@ -411,5 +3271,239 @@ def main_gui():
     root.mainloop()
 
 
+# --- Command Line ---
+def _stretched_speech(text_input: str, args, on_progress=None):
+    """Synthesizes text_input at 1.0x as raw PCM and yields it time-stretched to args.speed, block by block."""
+    blocks = iter_speech(text_input, model=args.model, voice=args.voice, speed=1.0, response_format="pcm",
+                         max_workers=args.workers, use_cache=not args.no_cache, cancel=args.cancel, on_progress=on_progress)
+    return iter_stretched_pcm(blocks, args.speed)
+
+
+def _convert_file(text_input: str, output_path: Path, args, on_progress=None) -> Path:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if args.local_speed:
+        blocks = _stretched_speech(text_input, args, on_progress)
+        if args.format == "wav":
+            _write_pcm_as_wav(blocks, output_path)
+            return output_path
+        partial_path = output_path.with_name(output_path.name + ".part")
+        try:
+            with open(partial_path, "wb") as output_file:
+                for block in blocks:
+                    output_file.write(block)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
+        os.replace(partial_path, output_path)
+        return output_path
+    return synthesize_document(text_input, output_path, model=args.model, voice=args.voice, speed=args.speed,
+                               response_format=args.format, max_workers=args.workers, use_cache=not args.no_cache,
+                               cancel=args.cancel, on_progress=on_progress)
+
+
+def _stream_to_stdout(text_input: str, args, on_progress=None):
+    """Writes the audio to stdout as it arrives; anything printed meanwhile goes to stderr so it cannot mix in."""
+    output = sys.stdout.buffer
+    with redirect_stdout(sys.stderr):
+        if args.local_speed:
+            blocks = _stretched_speech(text_input, args, on_progress)
+            if args.format == "wav":
+                # The length is not known yet, so the header claims the largest size, as streamed WAV usually does
+                output.write(_wav_header(0xFFFFFFFF - 36, 1, 2, PCM_SAMPLE_RATE))
+        else:
+            blocks = iter_speech(text_input, model=args.model, voice=args.voice, speed=args.speed,
+                                 response_format=args.format, max_workers=args.workers, use_cache=not args.no_cache,
+                                 cancel=args.cancel, on_progress=on_progress)
+        for audio in blocks:
+            output.write(audio)
+            output.flush()
+
+
+class _ProgressLine:
+    """Keeps a single, rewritten progress line on stderr."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._width = 0
+
+    def __call__(self, progress: dict):
+        line = format_progress(progress)
+        with self._lock:
+            sys.stderr.write("\r" + line.ljust(self._width))
+            sys.stderr.flush()
+            self._width = max(self._width, len(line))
+
+    def close(self):
+        with self._lock:
+            if self._width:
+                sys.stderr.write("\n")
+                self._width = 0
+
+
+def _collect_batch_inputs(inputs: list, pattern: str) -> list:
+    """Expands the batch inputs into (text_file, path_relative_to_input) pairs, walking directories recursively."""
+    files = []
+    for name in inputs:
+        path = Path(name)
+        if path.is_dir():
+            files.extend((found, found.relative_to(path)) for found in sorted(path.rglob(pattern)) if found.is_file())
+        else:
+            files.append((path, Path(path.name)))
+    return files
+
+
+def _run_convert(args) -> int:
+    hedge_policy.enabled = hedge_policy.enabled or args.hedge
+    if args.input == "-":
+        text_input = sys.stdin.read()
+        output_path = Path(args.output or f"speech_output.{args.format}")
+    else:
+        text_input = Path(args.input).read_text(encoding="utf-8")
+        output_path = Path(args.output or Path(args.input).with_suffix(f".{args.format}"))
+    progress_line = _ProgressLine() if args.progress else None
+    try:
+        if args.output == "-":
+            _stream_to_stdout(text_input, args, on_progress=progress_line)
+        else:
+            _convert_file(text_input, output_path, args, on_progress=progress_line)
+    except BrokenPipeError:
+        # The reading process went away; point stdout at devnull so the interpreter's final flush stays quiet
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        print("Output pipe closed; conversion stopped.", file=sys.stderr)
+        return 1
+    except Exception as e:
+        print(f"Error converting {args.input}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if progress_line:
+            progress_line.close()
+    if args.output != "-":
+        print(f"Speech saved to: {output_path}")
+    return 0
+
+
+def _run_batch(args) -> int:
+    hedge_policy.enabled = hedge_policy.enabled or args.hedge
+    files = _collect_batch_inputs(args.inputs, args.pattern)
+    if not files:
+        print("No input files found.", file=sys.stderr)
+        return 1
+
+    def convert_one(text_file, relative_path):
+        output_path = (Path(args.output_dir) / relative_path) if args.output_dir else text_file
+        return _convert_file(text_file.read_text(encoding="utf-8"), output_path.with_suffix(f".{args.format}"), args)
+
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = {executor.submit(convert_one, text_file, relative_path): text_file for text_file, relative_path in files}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    print(f"[{done}/{len(files)}] {futures[future]} -> {future.result()}")
+                except Exception as e:
+                    failures += 1
+                    print(f"[{done}/{len(files)}] Error converting {futures[future]}: {e}", file=sys.stderr)
+        except KeyboardInterrupt:
+            # Stop the running conversions too, rather than waiting for them when leaving the executor
+            args.cancel.cancel()
+            for future in futures:
+                future.cancel()
+            raise
+    print(f"Converted {len(files) - failures} of {len(files)} files.")
+    for metrics in endpoint_pool.metrics():
+        print(f"  {metrics['name']}: concurrency limit {metrics['concurrency_limit']:.1f}, {metrics['throttled']} throttled responses")
+    if hedge_policy.enabled:
+        print(f"  Hedged requests: {hedge_policy.hedges}, of which the duplicate finished first: {hedge_policy.hedge_wins}")
+    return 1 if failures else 0
+
+
+def _run_play(args) -> int:
+    missing = [name for name in args.files if not Path(name).is_file()]
+    if missing:
+        print(f"Error: No such file: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    try:
+        playback_queue = PlaybackQueue(on_clip_started=lambda path: print(f"Playing: {path}"))
+    except Exception as e:  # pygame.error, or pygame missing
+        print(f"Error: Could not open the audio device: {e}", file=sys.stderr)
+        return 1
+    try:
+        for _ in range(max(1, args.repeat)):
+            for name in args.files:
+                playback_queue.add(name, name)
+        playback_queue.close()
+        playback_queue.wait()
+    finally:
+        playback_queue.stop()
+    return 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="tts_tool", description="Convert text to speech with OpenAI's TTS API. Run without arguments to open the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--model", default="tts-1", help="TTS model (default: %(default)s)")
+    common.add_argument("--voice", default="alloy", help="Voice (default: %(default)s)")
+    common.add_argument("--speed", type=float, default=1.0, help="Speech speed from 0.25 to 4.0 (default: %(default)s)")
+    common.add_argument("--format", default="mp3", choices=["mp3", "opus", "aac", "flac", "wav", "pcm"], help="Audio format (default: %(default)s)")
+    common.add_argument("--workers", type=int, help="Maximum concurrent requests per document (default: the combined endpoint limit)")
+    common.add_argument("--no-cache", action="store_true", help="Always call the API instead of reusing cached audio")
+    common.add_argument("--hedge", action="store_true", help="Send a duplicate of unusually slow requests and use whichever finishes first")
+    common.add_argument("--local-speed", action="store_true",
+                        help="Synthesize at 1.0x and apply --speed locally, so cached audio serves every speed (wav and pcm only)")
+
+    convert = commands.add_parser("convert", parents=[common], help="Convert one text file, or stdin, to speech")
+    convert.add_argument("input", nargs="?", default="-", help="Text file to convert, or - for stdin (default)")
+    convert.add_argument("-o", "--output", help="Output audio file, or - to stream the audio to stdout "
+                                                "(default: the input name with the format's extension)")
+    convert.add_argument("--progress", action=argparse.BooleanOptionalAction, default=sys.stderr.isatty(),
+                         help="Show bytes received, throughput and time left on stderr (default: when stderr is a terminal)")
+    convert.set_defaults(handler=_run_convert)
+
+    batch = commands.add_parser("batch", parents=[common], help="Convert many text files or directory trees to speech")
+    batch.add_argument("inputs", nargs="+", help="Text files and/or directories to search recursively")
+    batch.add_argument("-o", "--output-dir", help="Directory for the audio files, mirroring the input tree (default: next to each input)")
+    batch.add_argument("--pattern", default="*.txt", help="File pattern searched for in directories (default: %(default)s)")
+    batch.add_argument("-j", "--jobs", type=int, default=2, help="Documents converted at the same time (default: %(default)s)")
+    batch.set_defaults(handler=_run_batch)
+
+    play = commands.add_parser("play", help="Play audio files back to back without gaps")
+    play.add_argument("files", nargs="+", help="Audio files, played in the order given")
+    play.add_argument("--repeat", type=int, default=1, help="Times to play the whole sequence (default: %(default)s)")
+    play.set_defaults(handler=_run_play)
+
+    commands.add_parser("gui", help="Open the GUI").set_defaults(handler=lambda args: main_gui() or 0)
+    return parser
+
+
+def main_cli(argv: Optional[list] = None) -> int:
+    """
+    Command line entry point. Apart from play, only the synthesis code is used, so it runs without a display or audio device.
+
+    Args:
+        argv (list[str], optional): The arguments, defaulting to sys.argv[1:].
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "local_speed", False) and args.format not in ("wav", "pcm"):
+        parser.error("--local-speed needs --format wav or pcm, the formats that can be written locally")
+    if args.command in ("convert", "batch") and not API_CONFIGURED:
+        print(f"Error: {_configuration_problem()}", file=sys.stderr)
+        return 2
+    args.cancel = CancellationToken()
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        args.cancel.cancel()
+        print("Cancelled." if args.command == "play" else "Cancelled; partially written files were removed.", file=sys.stderr)
+        return 130
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main_cli())
     main_gui()